@@ -0,0 +1,237 @@
+"""Synthetic scan benchmark for ExamReader and QRGenerator.
+
+Builds exam scans from real label sheets, degrades them the way a document
+scanner does (skew, blur, noise, JPEG artefacts, A3 two-up sheets) and runs
+the reader end-to-end under CPython. Every scenario runs in a fresh process,
+so the reported peak RSS belongs to that scenario alone.
+
+    python benchmarks/scan_benchmark.py
+    python benchmarks/scan_benchmark.py --students 10 100 500 --json bench.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows, peak RSS is not reported
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "webapp", "python_modules"))
+
+import cv2
+import fitz
+import numpy as np
+from qr_generator import QRGenerator, PAGE_SPECS
+from qr_reader import ExamReader
+
+DPI = 150
+ANGLES = [-15, -10, -5, -2, 0, 2, 5, 10, 15]
+DEGRADATIONS = ["clean", "blur", "noise", "jpeg", "a3", "combined"]
+A4_POINTS = (595, 842)
+A3_POINTS = (1191, 842)
+
+
+def make_students(count):
+    return [{"id": str(100000 + i), "name": f"Schüler{i} Test"} for i in range(count)]
+
+
+def render_labels(students):
+    """Renders the label sheets and cuts out one grayscale label (QR code and name) per student."""
+    sheets = fitz.open(stream=QRGenerator(students).generate_qr_pdf_bytes(), filetype="pdf")
+    zoom = DPI / 72
+    labels = []
+    for i in range(len(students)):
+        page_index, position = divmod(i, PAGE_SPECS["qr_per_page"])
+        row, col = divmod(position, PAGE_SPECS["num_cols"])
+        x0 = PAGE_SPECS["margin-left"] + col * (PAGE_SPECS["col_width"] + PAGE_SPECS["col_sep"])
+        y0 = PAGE_SPECS["margin-top"] + row * (PAGE_SPECS["row_height"] + PAGE_SPECS["row_sep"])
+        clip = fitz.Rect(x0, y0, x0 + PAGE_SPECS["col_width"], y0 + PAGE_SPECS["row_height"])
+        pix = sheets[page_index].get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, colorspace=fitz.csGRAY)
+        labels.append(np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width).copy())
+    sheets.close()
+    return labels
+
+
+def exam_page(rng, page_no, label=None):
+    """A4 page at DPI with a header, ruled answer lines and some pen strokes, optionally with a label top right."""
+    width, height = int(A4_POINTS[0] / 72 * DPI), int(A4_POINTS[1] / 72 * DPI)
+    page = np.full((height, width), 255, dtype=np.uint8)
+    cv2.putText(page, f"Klassenarbeit - Seite {page_no}", (80, 120), cv2.FONT_HERSHEY_SIMPLEX, 1.2, 0, 2)
+    cv2.line(page, (80, 160), (width - 80, 160), 0, 2)
+    for y in range(320, height - 120, 45):
+        cv2.line(page, (80, y), (width - 80, y), 150, 1)
+    for _ in range(rng.integers(5, 15)):
+        points = np.cumsum(rng.integers(-12, 13, size=(30, 2)), axis=0) + rng.integers((120, 360), (width - 200, height - 200))
+        cv2.polylines(page, [points.astype(np.int32)], False, int(rng.integers(0, 80)), 2)
+    if label is not None:
+        (lh, lw) = label.shape
+        # Far enough inside the page to stay on it at 15° skew
+        page[260:260 + lh, width - 240 - lw:width - 240] = label
+    return page
+
+
+def degrade(img, angle, degradation, rng):
+    """Applies skew and the degradation, returns the image and the JPEG quality to embed it with."""
+    if angle:
+        (h, w) = img.shape
+        matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+        img = cv2.warpAffine(img, matrix, (w, h), flags=cv2.INTER_LINEAR, borderValue=255)
+    if degradation in ("blur", "combined"):
+        img = cv2.GaussianBlur(img, (0, 0), 1.2)
+    if degradation in ("noise", "combined"):
+        img = np.clip(img + rng.normal(0, 18, img.shape), 0, 255).astype(np.uint8)
+    quality = 25 if degradation in ("jpeg", "combined") else 85
+    return img, quality
+
+
+def build_scan(students, labels, degradation, seed=0):
+    """Returns (pdf bytes, scan options, truth) for a two-page scan of the class.
+
+    truth: one dict per source page with the expected QR payload, whether the page
+    carries the QR code and the skew angle of the sheet.
+    """
+    rng = np.random.default_rng(seed)
+    scan = fitz.open()
+    truth = []
+
+    def add_page(img, angle, points, key, has_qr):
+        img, quality = degrade(img, angle, degradation, rng)
+        ok, jpeg = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        page = scan.new_page(width=points[0], height=points[1])
+        page.insert_image(page.rect, stream=jpeg.tobytes())
+        truth.append({"key": key, "has_qr": has_qr, "angle": angle})
+
+    for i, (student, label) in enumerate(zip(students, labels)):
+        key = student["name"] + "_" + student["id"]
+        angle = ANGLES[i % len(ANGLES)]
+        if degradation == "a3":
+            # Folded A3 sheet: outside 4|1 with the label on page 1, inside 2|3
+            pages = [exam_page(rng, n, label if n == 1 else None) for n in (1, 2, 3, 4)]
+            add_page(np.hstack([pages[3], pages[0]]), angle, A3_POINTS, key, True)
+            add_page(np.hstack([pages[1], pages[2]]), angle, A3_POINTS, key, False)
+        else:
+            add_page(exam_page(rng, 1, label), angle, A4_POINTS, key, True)
+            add_page(exam_page(rng, 2), angle, A4_POINTS, key, False)
+
+    options = {"two_page_scan": True, "quick_and_dirty": True, "split_a3": degradation == "a3"}
+    pdf_bytes = scan.tobytes(garbage=3, deflate=True)
+    scan.close()
+    return pdf_bytes, options, truth
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_reader(pdf_bytes, options):
+    """Runs in a fresh process: scans, assigns and writes the ZIP, returns timing and per-page results."""
+    rss_before = peak_rss_mb()
+    reader = ExamReader([{"name": "scan.pdf", "data": pdf_bytes}], options, log_callback=lambda msg, type="info": None)
+    start = time.perf_counter()
+    ok = asyncio.run(reader.process())
+    seconds = time.perf_counter() - start
+    result = {
+        "ok": ok,
+        "seconds": seconds,
+        "detected": {page["page_num"]: page["qr"] for page in reader.page_data},
+        "assigned": {page["page_num"]: page["value"] for page in reader.pdf_page_array},
+        "zip_bytes": len(reader.get_zip_bytes() or b""),
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    reader.close()
+    return result
+
+
+def run_isolated(pdf_bytes, options):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(run_reader, pdf_bytes, options).result()
+
+
+def time_generator(students):
+    timings = {}
+    for vector in (True, False):
+        start = time.perf_counter()
+        pdf_bytes = QRGenerator(students).generate_qr_pdf_bytes(vector=vector)
+        timings["vector" if vector else "raster"] = {"seconds": round(time.perf_counter() - start, 3), "bytes": len(pdf_bytes)}
+    return timings
+
+
+def score(truth, result):
+    qr_pages = [(page_num, page) for page_num, page in enumerate(truth) if page["has_qr"]]
+    by_angle = {}
+    for page_num, page in qr_pages:
+        hit = result["detected"].get(page_num) == page["key"]
+        total = by_angle.setdefault(page["angle"], [0, 0])
+        total[0] += hit
+        total[1] += 1
+    detected = sum(hit for hit, _ in by_angle.values())
+    assigned = sum(1 for page_num, page in enumerate(truth) if result["assigned"].get(page_num) == page["key"])
+    return {
+        "detection_rate": detected / len(qr_pages),
+        "assignment_rate": assigned / len(truth),
+        "by_angle": {angle: hit / count for angle, (hit, count) in sorted(by_angle.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, nargs="+", default=[10, 30])
+    parser.add_argument("--degradations", nargs="+", choices=DEGRADATIONS, default=DEGRADATIONS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write all results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for count in args.students:
+        students = make_students(count)
+        generator = time_generator(students)
+        print(f"{count} students: labels in {generator['vector']['seconds']} s (vector), {generator['raster']['seconds']} s (raster)")
+        labels = render_labels(students)
+
+        for degradation in args.degradations:
+            pdf_bytes, options, truth = build_scan(students, labels, degradation, args.seed)
+            result = run_isolated(pdf_bytes, options)
+            row = {
+                "students": count,
+                "degradation": degradation,
+                "pages": len(truth),
+                "scan_bytes": len(pdf_bytes),
+                "seconds": round(result["seconds"], 3),
+                "pages_per_second": round(len(truth) / result["seconds"], 2),
+                "peak_rss_mb": result["peak_rss_mb"],
+                "rss_before_mb": result["rss_before_mb"],
+                "zip_bytes": result["zip_bytes"],
+                "generator": generator,
+                **score(truth, result),
+            }
+            results.append(row)
+            print(f"  {degradation:9} {row['pages']:5} pages  {row['seconds']:8.2f} s  {row['pages_per_second']:7.2f} pages/s  "
+                  f"detected {row['detection_rate']:7.1%}  assigned {row['assignment_rate']:7.1%}  peak RSS {row['peak_rss_mb']} MB")
+
+    print("\nDetection rate by angle:")
+    print(f"  {'':9}" + "".join(f"{angle:>7}" for angle in ANGLES))
+    for degradation in args.degradations:
+        rates = {}
+        for row in results:
+            if row["degradation"] != degradation:
+                continue
+            for angle, rate in row["by_angle"].items():
+                rates.setdefault(angle, []).append(rate)
+        print(f"  {degradation:9}" + "".join(f"{np.mean(rates[angle]):7.0%}" if angle in rates else f"{'-':>7}" for angle in ANGLES))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
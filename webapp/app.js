@@ -10,9 +10,18 @@ class DiRueLeiApp {
         this.allStudents = [];
         this.className = "";
         
+        // Files and options of the current scan session, new uploads are appended to it
+        this.scannedFileNames = [];
+        this.scannedOptionsKey = null;
+        this.studentResults = new Map(); // ZIP path -> student PDF, delivered one by one during the scan
+        
+        // Shared with the worker so a cancel reaches Python while it is busy (needs cross-origin isolation)
+        this.cancelFlag = self.crossOriginIsolated ? new Int32Array(new SharedArrayBuffer(4)) : null;
+        
         // Web Worker for all Python operations
         this.scanWorker = null;
         this.workerInitialized = false;
+        this.qrReady = false; // QR generation is loaded before the scan packages
     }
     
     async init() {
@@ -59,6 +68,16 @@ class DiRueLeiApp {
                 }
                 break;
                 
+            case 'FEATURE_READY':
+                console.table(data.timings);
+                if (data.feature === 'qr') {
+                    this.qrReady = true;
+                    if (!this.workerInitialized) {
+                        this.showStatus('QR-Code-Erzeugung bereit, Einlesen wird noch geladen.', 'init-progress');
+                    }
+                }
+                break;
+                
             case 'INIT_PROGRESS':
                 console.log(`Loading package ${data.current}/${data.total}: ${data.package}`);
                 this.showStatus(`Lade ${data.package} (Paket ${data.current}/${data.total})...`, 'init-progress');
@@ -69,7 +88,9 @@ class DiRueLeiApp {
                 break;
                 
             case 'SCAN_LOG':
-                this.handleScanLog(data.message, data.level);
+                if (data.level !== 'profile') {
+                    this.handleScanLog(data.message, data.level);
+                }
                 // fall-through
 
             case 'LOG':
@@ -80,11 +101,30 @@ class DiRueLeiApp {
                 this.handleQRComplete(data);
                 break;
                 
+            case 'SCAN_STUDENT':
+                this.studentResults.set(data.path, data.pdf);
+                this.handleScanLog(`PDF für ${data.row['Schüler/-in']} fertig (${data.row['Anzahl Seiten']} Seiten).`, 'success');
+                break;
+                
             case 'SCAN_COMPLETE':
+                this.setScanRunning(false);
                 this.handleScanComplete(data);
                 break;
                 
+            case 'SCAN_PROFILE':
+                console.table(data.report.stages);
+                console.log('Scan profile', data.report);
+                break;
+                
+            case 'SCAN_CANCELLED':
+                this.setScanRunning(false);
+                this.scannedFileNames = [];
+                this.handleScanLog('Einlesen abgebrochen.', 'warning');
+                break;
+                
             case 'ERROR':
+                this.setScanRunning(false);
+                this.scannedFileNames = [];
                 this.showStatus(data.message, 'error');
                 console.error('Worker error:', data.message);
                 break;
@@ -119,7 +159,9 @@ class DiRueLeiApp {
     
     handleScanComplete(data) {
         try {
-            this.downloadFile(data.zipBytes, 'scan-results.zip', 'application/zip');
+            // Progressive output: the worker sent the student PDFs one by one, no ZIP
+            const zipData = data.zipBytes || this.createZipBlob([...this.studentResults, ['summary.pdf', data.summaryBytes]]);
+            this.downloadFile(zipData, 'scan-results.zip', 'application/zip');
             
             const summaryElement = document.getElementById("download-results-btn");
             if (summaryElement) {
@@ -156,6 +198,7 @@ class DiRueLeiApp {
             {'id': 'pdf-files', 'func': this.handlePdfFilesUpload, 'event': 'change'},
             {'id': 'clear-pdf-files-btn', 'func': this.clearPdfFiles, 'event': 'click'},
             {'id': 'process-pdf-btn', 'func': this.startPdfScan, 'event': 'click'},
+            {'id': 'cancel-scan-btn', 'func': this.cancelPdfScan, 'event': 'click'},
             {'id': 'checkbox-use-offset', 'func': this.toggleOffset, 'event': 'change'},
             {'id': 'checkbox-select-students', 'func': this.toggleSelectStudents, 'event': 'change'},
             {'id': 'select-all', 'func': this.toggleSelectAll, 'event': 'change'},
@@ -401,11 +444,11 @@ class DiRueLeiApp {
             this.initializeScanWorker();
         }
         
-        // Wait for worker to be ready
-        if (!this.workerInitialized) {
+        // Wait for the QR packages, the scan packages may still be loading
+        if (!this.qrReady) {
             this.showStatus('Warten auf vollständiges Laden der Anwendung.', 'info');
             const checkReady = setInterval(() => {
-                if (this.workerInitialized) {
+                if (this.qrReady) {
                     clearInterval(checkReady);
                     this.generateQRPdf(); // Retry
                 }
@@ -528,6 +571,8 @@ class DiRueLeiApp {
         
         if (extension == 'pdf') {
             this.pdfFiles = [];
+            this.scannedFileNames = [];
+            this.scanWorker?.postMessage({ type: 'SCAN_RESET' });
             document.getElementById('clear-pdf-files-btn')?.classList.add('hidden');
         }
     }
@@ -590,21 +635,47 @@ class DiRueLeiApp {
                 splitA3: document.getElementById('split-a3')?.checked || false,
                 quickAndDirty: document.getElementById('quick-and-dirty')?.checked || false,
                 qrPositionA4: document.getElementById('qr-position-a4')?.value || 'vorne',
-                qrPositionA3: document.getElementById('qr-position-a3')?.value || 'aussen'
+                qrPositionA3: document.getElementById('qr-position-a3')?.value || 'aussen',
+                scanWorkers: parseInt(document.getElementById('scan-workers')?.value) || 1,
+                streamOutput: document.getElementById('stream-output')?.checked || false,
+                pageTimeBudget: parseFloat(document.getElementById('page-time-budget')?.value) || 0,
+                progressiveOutput: document.getElementById('progressive-output')?.checked || false,
+                optimizeOutput: document.getElementById('optimize-output')?.checked || false,
+                outputDpi: parseInt(document.getElementById('output-dpi')?.value) || 150,
+                outputJpegQuality: parseInt(document.getElementById('output-jpeg-quality')?.value) || 60,
+                outputColor: document.getElementById('output-color')?.value || 'color',
+                profile: document.getElementById('profile-scan')?.checked || false
             };
             
-            const pdfFilesForWorker = this.pdfFiles.map(file => ({
+            // Same options and only new files: the worker only scans the new pages
+            const optionsKey = JSON.stringify(scanOptions);
+            const newFiles = this.pdfFiles.filter(file => !this.scannedFileNames.includes(file.name));
+            const append = this.scannedFileNames.length > 0 && optionsKey === this.scannedOptionsKey && newFiles.length > 0;
+            
+            // Copies are transferred, not cloned again: the worker owns them, the originals stay for re-scans
+            const pdfFilesForWorker = (append ? newFiles : this.pdfFiles).map(file => ({
                 name: file.name,
-                data: new Uint8Array(file.data) // Create a copy
+                data: new Uint8Array(file.data)
             }));
             
+            if (this.cancelFlag) {
+                Atomics.store(this.cancelFlag, 0, 0);
+            }
+            if (!append) {
+                this.studentResults.clear();
+            }
             this.scanWorker.postMessage({
-                type: 'SCAN_START',
+                type: append ? 'SCAN_APPEND' : 'SCAN_START',
                 data: {
                     pdfFiles: pdfFilesForWorker,
-                    options: scanOptions
+                    options: scanOptions,
+                    cancelFlag: this.cancelFlag
                 }
-            });
+            }, pdfFilesForWorker.map(file => file.data.buffer));
+            this.setScanRunning(true);
+            
+            this.scannedFileNames = this.pdfFiles.map(file => file.name);
+            this.scannedOptionsKey = optionsKey;
             
         } catch (error) {
             this.showStatus(`Fehler beim Scannen der PDFs: ${error.message}`, 'error');
@@ -612,6 +683,19 @@ class DiRueLeiApp {
         }
     }
     
+    cancelPdfScan() {
+        if (this.cancelFlag) {
+            Atomics.store(this.cancelFlag, 0, 1);
+        }
+        this.scanWorker?.postMessage({ type: 'SCAN_CANCEL' });
+        this.showStatus('Einlesen wird abgebrochen...', 'info');
+    }
+    
+    setScanRunning(running) {
+        document.getElementById('cancel-scan-btn')?.classList.toggle('hidden', !running);
+        document.getElementById('process-pdf-btn')?.classList.toggle('hidden', running);
+    }
+    
     // Utility methods
     readFileAsText(file) {
         return new Promise((resolve, reject) => {
@@ -631,6 +715,61 @@ class DiRueLeiApp {
         });
     }
     
+    // Stored (uncompressed) ZIP as a Blob of parts, no single buffer holds the whole archive.
+    // Scanned PDFs barely compress, the worker stores them uncompressed as well.
+    createZipBlob(entries) {
+        const encoder = new TextEncoder();
+        const now = new Date();
+        const dosTime = (now.getHours() << 11) | (now.getMinutes() << 5) | (now.getSeconds() >> 1);
+        const dosDate = ((now.getFullYear() - 1980) << 9) | ((now.getMonth() + 1) << 5) | now.getDate();
+        const parts = [];
+        const directory = [];
+        let offset = 0;
+        
+        for (const [path, data] of entries) {
+            const name = encoder.encode(path);
+            const crc = crc32(data);
+            
+            const header = new DataView(new ArrayBuffer(30));
+            header.setUint32(0, 0x04034b50, true);
+            header.setUint16(4, 20, true);
+            header.setUint16(6, 0x0800, true); // UTF-8 file names
+            header.setUint16(10, dosTime, true);
+            header.setUint16(12, dosDate, true);
+            header.setUint32(14, crc, true);
+            header.setUint32(18, data.length, true);
+            header.setUint32(22, data.length, true);
+            header.setUint16(26, name.length, true);
+            parts.push(header, name, data);
+            
+            const entry = new DataView(new ArrayBuffer(46));
+            entry.setUint32(0, 0x02014b50, true);
+            entry.setUint16(4, 20, true);
+            entry.setUint16(6, 20, true);
+            entry.setUint16(8, 0x0800, true);
+            entry.setUint16(12, dosTime, true);
+            entry.setUint16(14, dosDate, true);
+            entry.setUint32(16, crc, true);
+            entry.setUint32(20, data.length, true);
+            entry.setUint32(24, data.length, true);
+            entry.setUint16(28, name.length, true);
+            entry.setUint32(42, offset, true);
+            directory.push(entry, name);
+            
+            offset += 30 + name.length + data.length;
+        }
+        
+        const directorySize = directory.reduce((size, part) => size + part.byteLength, 0);
+        const end = new DataView(new ArrayBuffer(22));
+        end.setUint32(0, 0x06054b50, true);
+        end.setUint16(8, entries.length, true);
+        end.setUint16(10, entries.length, true);
+        end.setUint32(12, directorySize, true);
+        end.setUint32(16, offset, true);
+        
+        return new Blob([...parts, ...directory, end], { type: 'application/zip' });
+    }
+    
     downloadFile(data, filename, mimeType) {
         const blob = new Blob([data], { type: mimeType });
         const url = URL.createObjectURL(blob);
@@ -829,6 +968,22 @@ function showMainPage() {
 
 let app;
 
+const CRC32_TABLE = Array.from({ length: 256 }, (_, n) => {
+    let c = n;
+    for (let k = 0; k < 8; k++) {
+        c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1;
+    }
+    return c >>> 0;
+});
+
+function crc32(data) {
+    let crc = 0xFFFFFFFF;
+    for (let i = 0; i < data.length; i++) {
+        crc = CRC32_TABLE[(crc ^ data[i]) & 0xFF] ^ (crc >>> 8);
+    }
+    return (crc ^ 0xFFFFFFFF) >>> 0;
+}
+
 // Function to update footer with deployment timestamp
 async function updateFooterTimestamp() {
     try {
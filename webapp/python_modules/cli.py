@@ -0,0 +1,177 @@
+"""Command-line entry point for processing scans and generating labels on a server.
+
+    python cli.py scan SCAN_DIR OUTPUT_DIR --two-page-scan --workers 8
+    python cli.py labels kurs_10a_.csv kurs_10b_.csv -o labels.pdf
+
+scan: every PDF directly in SCAN_DIR is one batch, every subdirectory is one
+batch made of the PDFs it contains (in name order). Batches run in a process
+pool. Each batch writes <name>.zip, <name>_summary.pdf and <name>.log into
+OUTPUT_DIR.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from qr_reader import ExamReader
+from qr_generator import QRBatchGenerator, read_students_csv, guess_course_name
+
+
+def find_batches(scan_dir):
+    """Returns (batch name, [pdf paths]) for the PDFs and subdirectories of scan_dir."""
+    batches = []
+    for entry in sorted(Path(scan_dir).iterdir()):
+        if entry.is_file() and entry.suffix.lower() == ".pdf":
+            batches.append((entry.stem, [entry]))
+        elif entry.is_dir():
+            pdfs = sorted(path for path in entry.iterdir() if path.is_file() and path.suffix.lower() == ".pdf")
+            if pdfs:
+                batches.append((entry.name, pdfs))
+    return batches
+
+
+def scan_batch(name, pdf_paths, scan_options, output_dir):
+    """Runs one batch end-to-end and writes its outputs, returns a result row."""
+    output_dir = Path(output_dir)
+    start = time.perf_counter()
+    with open(output_dir / f"{name}.log", "w", encoding="utf-8") as log_file:
+        log = lambda msg, type="info": log_file.write(f"[{type}] {msg}\n")
+
+        files = [{"name": path.name, "data": path.read_bytes()} for path in pdf_paths]
+        reader = ExamReader(files, scan_options, log_callback=log)
+        zip_path = output_dir / f"{name}.zip"
+        try:
+            if scan_options.get("stream_output"):
+                # The archive is written straight into the file, never held in memory
+                with open(zip_path, "wb") as zip_file:
+                    reader.zip_file = zip_file
+                    ok = asyncio.run(reader.process())
+                if not ok:
+                    zip_path.unlink()
+            else:
+                ok = asyncio.run(reader.process())
+                if ok:
+                    zip_path.write_bytes(reader.get_zip_bytes())
+            if ok:
+                (output_dir / f"{name}_summary.pdf").write_bytes(reader.get_summary_bytes())
+            return {
+                "batch": name,
+                "ok": ok,
+                "pages": len(reader.source_pdf),
+                "students": len(reader.student_page_map) if ok else 0,
+                "missing": [page + 1 for page in reader.missing_pages],
+                "seconds": round(time.perf_counter() - start, 2),
+            }
+        finally:
+            reader.close()
+
+
+def run_scan(args):
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    batches = find_batches(args.scan_dir)
+    if not batches:
+        print(f"No PDF files found in {args.scan_dir}", file=sys.stderr)
+        return 1
+
+    scan_options = {
+        "two_page_scan": args.two_page_scan,
+        "split_a3": args.split_a3,
+        "quick_and_dirty": args.quick_and_dirty,
+        "qr_position_a4": args.qr_position_a4,
+        "qr_position_a3": args.qr_position_a3,
+        "render_zoom": args.render_zoom,
+        "stream_output": args.stream_output,
+        "page_time_budget": args.page_time_budget,
+        "optimize_output": args.optimize_output,
+        "output_dpi": args.output_dpi,
+        "output_jpeg_quality": args.output_jpeg_quality,
+        "output_color": args.output_color,
+    }
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(batches))) as pool:
+        futures = {pool.submit(scan_batch, name, paths, scan_options, output_dir): name for (name, paths) in batches}
+        for future in as_completed(futures):
+            try:
+                row = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"{futures[future]}: failed: {e}", file=sys.stderr)
+                continue
+            if not row["ok"]:
+                failed += 1
+                print(f"{row['batch']}: failed, see {row['batch']}.log", file=sys.stderr)
+                continue
+            missing = f", unassigned pages {row['missing']}" if row["missing"] else ""
+            print(f"{row['batch']}: {row['pages']} pages, {row['students']} students in {row['seconds']} s{missing}")
+
+    print(f"{len(batches) - failed} of {len(batches)} batch(es) done, outputs in {output_dir}")
+    return 1 if failed else 0
+
+
+def run_labels(args):
+    rosters = []
+    for csv_path in args.csv_files:
+        csv_path = Path(csv_path)
+        rosters.append({
+            "course": guess_course_name(csv_path.name) or csv_path.stem,
+            "students": read_students_csv(csv_path.read_text(encoding="utf-8-sig")),
+            "copies": args.copies,
+        })
+
+    generator = QRBatchGenerator(rosters)
+    vector = not args.raster
+    if args.separate:
+        output_dir = Path(args.output)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for (course, pdf_bytes) in generator.iter_course_pdfs(vector):
+            (output_dir / f"QR-Codes_{course}.pdf").write_bytes(pdf_bytes)
+    else:
+        with open(args.output, "wb") as output:
+            generator.generate_combined_pdf_bytes(vector, output=output)
+
+    for row in generator.get_report():
+        print(f"{row['course']}: {row['students']} students, {row['labels']} labels on {row['pages']} page(s) in {row['seconds']} s")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless scan processing and label generation.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan = commands.add_parser("scan", help="process a directory of scan PDFs")
+    scan.add_argument("scan_dir")
+    scan.add_argument("output_dir")
+    scan.add_argument("--two-page-scan", action="store_true")
+    scan.add_argument("--split-a3", action="store_true")
+    scan.add_argument("--quick-and-dirty", action="store_true")
+    scan.add_argument("--qr-position-a4", choices=["vorne", "hinten"], default="vorne")
+    scan.add_argument("--qr-position-a3", choices=["innen", "aussen"], default="aussen")
+    scan.add_argument("--render-zoom", type=float, default=3)
+    scan.add_argument("--stream-output", action="store_true", help="write the ZIP straight to disk, one student PDF in memory at a time")
+    scan.add_argument("--page-time-budget", type=float, default=0, help="seconds per page, 0: no limit")
+    scan.add_argument("--optimize-output", action="store_true", help="recompress page images for smaller uploads")
+    scan.add_argument("--output-dpi", type=int, default=150)
+    scan.add_argument("--output-jpeg-quality", type=int, default=60)
+    scan.add_argument("--output-color", choices=["color", "gray", "bilevel"], default="color")
+    scan.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="batches processed in parallel")
+    scan.set_defaults(func=run_scan)
+
+    labels = commands.add_parser("labels", help="generate QR label sheets from participant CSV exports")
+    labels.add_argument("csv_files", nargs="+")
+    labels.add_argument("-o", "--output", required=True, help="PDF file, or directory with --separate")
+    labels.add_argument("--copies", type=int, default=1)
+    labels.add_argument("--separate", action="store_true", help="one PDF per course instead of one combined PDF")
+    labels.add_argument("--raster", action="store_true", help="embed QR codes as images instead of vector paths")
+    labels.set_defaults(func=run_labels)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
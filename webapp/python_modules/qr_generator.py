@@ -1,6 +1,7 @@
 import csv
 import io
 import re
+import time
 from PIL import Image
 import qrcode
 from reportlab.pdfgen import canvas        
@@ -8,6 +9,34 @@ from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import cm   
 from reportlab.lib.utils import ImageReader
 
+_, page_height = A4
+PAGE_SPECS = {
+    "page_height": page_height,
+    "margin-top": 1 * cm,
+    "margin-left": 0.7 * cm,
+    "col_width": 3.5 * cm,
+    "row_height": 3.5 * cm,
+    "row_sep": 0.5 * cm,
+    "col_sep": 0.5 * cm,
+    "num_cols": 5, 
+    "num_rows": 7,
+    "qr_size": 2 * cm
+}
+PAGE_SPECS["qr_per_page"] = PAGE_SPECS["num_rows"] * PAGE_SPECS["num_cols"]
+
+def read_students_csv(csv_text):
+    """Parses a participant export like the web app does: header row, ID in the first and
+    full name in the second column. Sorted by last name."""
+    rows = list(csv.reader(io.StringIO(csv_text.strip())))
+    students = [{"id": row[0].strip(), "name": row[1].strip().replace('"', '')} for row in rows[1:] if len(row) >= 2]
+    students.sort(key=lambda student: student["name"].split(" ")[-1])
+    return students
+
+def guess_course_name(file_name):
+    """Class name like "10b" from an export file name such as "Kurs_10b_Teilnehmer.csv", or ""."""
+    match = re.search(r"_(\d{1,2}[a-z])_", file_name)
+    return match.group(1) if match else ""
+
 class QRGenerator:
     def __init__(self, students):
         if (hasattr(students, "to_py")) :
@@ -18,16 +47,46 @@ class QRGenerator:
     def get_students(self):
         return self.students
     
-    def create_qr_image(self, id, name):
+    def create_qr_code(self, id, name):
         qr = qrcode.QRCode(version=1, box_size=10, border=2)
         qr.add_data(name + "_" + id)
         qr.make(fit=True)
+        return qr
+
+    def create_qr_image(self, id, name):
+        qr = self.create_qr_code(id, name)
         img_qr = qr.make_image(fill_color="black", back_color="white").convert("RGB")
         qr_size_px = int((3 / 2.54) * 300) 
         img_qr = img_qr.resize((qr_size_px, qr_size_px), Image.LANCZOS)
         return img_qr
     
-    def generate_qr_pdf_bytes(self, copies=1, offset_row=1, offset_col=1):
+    def draw_qr_form(self, c, form_name, id, name, page_height):
+        """Defines the QR code as a form XObject of unit-sized modules, drawn as one path of row runs."""
+        matrix = self.create_qr_code(id, name).get_matrix()
+        modules = len(matrix)
+
+        c.beginForm(form_name, lowerx=0, lowery=0, upperx=modules, uppery=modules)
+        # Forms start with the top-down page flip of the canvas, undo it to draw in module units
+        c.transform(1, 0, 0, -1, 0, page_height)
+        path = c.beginPath()
+        for row, cells in enumerate(matrix):
+            col = 0
+            while col < modules:
+                if not cells[col]:
+                    col += 1
+                    continue
+                run_start = col
+                while col < modules and cells[col]:
+                    col += 1
+                path.rect(run_start, row, col - run_start, 1)
+        c.setFillColorRGB(0, 0, 0)
+        c.drawPath(path, stroke=0, fill=1)
+        c.endForm()
+        return modules
+
+    def generate_qr_pdf_bytes(self, copies=1, offset_row=1, offset_col=1, vector=True):
+        # vector: draw QR modules as PDF paths, each distinct code once as a reusable form XObject
+
         try:
             python_students = self.students
             
@@ -35,77 +94,10 @@ class QRGenerator:
             if not python_students:
                 raise ValueError("No students data available for PDF generation")
             
-            _, page_height = A4
             buffer = io.BytesIO()
             c = canvas.Canvas(buffer, pagesize=A4, bottomup=0)
 
-            page_specs = {
-                "page_height": page_height,
-                "margin-top": 1 * cm,
-                "margin-left": 0.7 * cm,
-                "col_width": 3.5 * cm,
-                "row_height": 3.5 * cm,
-                "row_sep": 0.5 * cm,
-                "col_sep": 0.5 * cm,
-                "num_cols": 5, 
-                "num_rows": 7,
-                "qr_size": 2 * cm
-            }
-
-            offset = (offset_row - 1) * page_specs['num_cols'] + offset_col - 1
-            
-            if copies != 1:
-                python_students = self._repeat_array(python_students, copies)
-
-            page_specs["qr_per_page"] = page_specs["num_rows"] * page_specs["num_cols"]
-            x_start = page_specs["margin-left"] + (page_specs["col_width"] - page_specs["qr_size"]) / 2
-            y_start = page_specs["margin-top"] + (page_specs["row_height"] - page_specs["qr_size"] - 0.5 * cm) / 2
-
-            if not python_students:
-                c.showPage()
-            
-            for i, student in enumerate(python_students):
-                try:
-                    qr_img = self.create_qr_image(student["id"], student["name"])
-                    img_buffer = io.BytesIO()
-                    qr_img.save(img_buffer, format="PNG")
-                    img_buffer.seek(0)
-                    img_reader = ImageReader(img_buffer)
-
-                    pos_number = i + offset
-                    col = pos_number % page_specs["num_cols"]
-                    row = (pos_number // page_specs["num_cols"]) % page_specs["num_rows"]
-
-                    if pos_number != 0 and pos_number % page_specs["qr_per_page"] == 0:
-                        c.showPage()
-
-                    x = x_start + page_specs["col_width"] * col + page_specs["col_sep"] * col
-                    y = y_start + row * page_specs["row_height"] + row * page_specs["row_sep"]
-
-                    c.drawImage(img_reader, x, y, page_specs["qr_size"], page_specs["qr_size"])
-                    font_size = 10
-                    c.setFont("Helvetica", font_size)
-
-                    text_x = x + (page_specs["qr_size"] / 2)
-                    text_y = y + page_specs["qr_size"] + 12
-
-                    name_to_print = str(student["name"])  # Ensure string
-                    if c.stringWidth(name_to_print, "Helvetica", font_size) > (page_specs["col_width"] - 0.3 * cm):
-                        names = student["name"].split()
-                        for j, name in enumerate(names):  # Changed i to j to avoid conflict
-                            if j == 0:
-                                name_to_print = name
-                                continue
-                            name_to_print = name_to_print + " " + name[0] + "."
-
-                    c.drawCentredString(text_x, text_y, name_to_print)
-                    
-                    # Close image buffer
-                    img_buffer.close()
-                    
-                except Exception as e:
-                    raise RuntimeError(f"Error processing student {student['name']}: {str(e)}")
-                    continue  # Skip this student and continue with others
+            self.draw_labels(c, python_students, copies, offset_row, offset_col, vector)
 
             # Ensure the PDF is properly finalized
             c.save()
@@ -123,8 +115,157 @@ class QRGenerator:
             print(f"Error generating PDF: {str(e)}")
             raise
 
+    def draw_labels(self, c, python_students, copies=1, offset_row=1, offset_col=1, vector=True, qr_forms=None):
+        """Draws the label grid onto the current and following pages of canvas c.
+
+        qr_forms maps QR payloads to already defined form XObjects of this canvas,
+        pass the same dict to share forms across several calls.
+        """
+        page_specs = PAGE_SPECS
+        offset = (offset_row - 1) * page_specs['num_cols'] + offset_col - 1
+        
+        if copies != 1:
+            python_students = self._repeat_array(python_students, copies)
+
+        x_start = page_specs["margin-left"] + (page_specs["col_width"] - page_specs["qr_size"]) / 2
+        y_start = page_specs["margin-top"] + (page_specs["row_height"] - page_specs["qr_size"] - 0.5 * cm) / 2
+
+        if not python_students:
+            c.showPage()
+        
+        if qr_forms is None:
+            qr_forms = {}
+        for i, student in enumerate(python_students):
+            try:
+                if vector:
+                    form_key = student["name"] + "_" + student["id"]
+                    if form_key not in qr_forms:
+                        form_name = f"qr{len(qr_forms)}"
+                        qr_forms[form_key] = (form_name, self.draw_qr_form(c, form_name, student["id"], student["name"], page_specs["page_height"]))
+                else:
+                    qr_img = self.create_qr_image(student["id"], student["name"])
+                    img_buffer = io.BytesIO()
+                    qr_img.save(img_buffer, format="PNG")
+                    img_buffer.seek(0)
+                    img_reader = ImageReader(img_buffer)
+
+                pos_number = i + offset
+                col = pos_number % page_specs["num_cols"]
+                row = (pos_number // page_specs["num_cols"]) % page_specs["num_rows"]
+
+                if pos_number != 0 and pos_number % page_specs["qr_per_page"] == 0:
+                    c.showPage()
+
+                x = x_start + page_specs["col_width"] * col + page_specs["col_sep"] * col
+                y = y_start + row * page_specs["row_height"] + row * page_specs["row_sep"]
+
+                if vector:
+                    (form_name, modules) = qr_forms[form_key]
+                    c.saveState()
+                    c.translate(x, y)
+                    c.scale(page_specs["qr_size"] / modules, page_specs["qr_size"] / modules)
+                    c.doForm(form_name)
+                    c.restoreState()
+                else:
+                    c.drawImage(img_reader, x, y, page_specs["qr_size"], page_specs["qr_size"])
+                font_size = 10
+                c.setFont("Helvetica", font_size)
+
+                text_x = x + (page_specs["qr_size"] / 2)
+                text_y = y + page_specs["qr_size"] + 12
+
+                name_to_print = str(student["name"])  # Ensure string
+                if c.stringWidth(name_to_print, "Helvetica", font_size) > (page_specs["col_width"] - 0.3 * cm):
+                    names = student["name"].split()
+                    for j, name in enumerate(names):  # Changed i to j to avoid conflict
+                        if j == 0:
+                            name_to_print = name
+                            continue
+                        name_to_print = name_to_print + " " + name[0] + "."
+
+                c.drawCentredString(text_x, text_y, name_to_print)
+                
+                # Close image buffer
+                if not vector:
+                    img_buffer.close()
+                
+            except Exception as e:
+                raise RuntimeError(f"Error processing student {student['name']}: {str(e)}")
+
     def _repeat_array(self, array, number_copies=1):
         result = []
         for element in array:
             result.extend([element] * number_copies)
-        return result
\ No newline at end of file
+        return result
+
+
+class QRBatchGenerator:
+    """Label sheets for many courses in one call.
+
+    rosters: list of dicts with "course" and "students", optionally "copies",
+    "offset_row" and "offset_col". Every course starts on a new page.
+    """
+    def __init__(self, rosters):
+        if (hasattr(rosters, "to_py")) :
+            rosters = rosters.to_py()
+        self.rosters = rosters
+        self.report = []
+
+    def iter_course_pdfs(self, vector=True):
+        """Yields (course, pdf_bytes) one course at a time, so only one course is held in memory."""
+        self.report = []
+        for roster in self.rosters:
+            start = time.perf_counter()
+            buffer = io.BytesIO()
+            c = canvas.Canvas(buffer, pagesize=A4, bottomup=0)
+            pages = self._draw_course(c, roster, vector, {})
+            c.save()
+            self._add_report_row(roster, pages, start)
+            yield (roster["course"], buffer.getvalue())
+            buffer.close()
+
+    def generate_course_pdfs(self, vector=True):
+        return [{"course": course, "pdf": pdf_bytes} for (course, pdf_bytes) in self.iter_course_pdfs(vector)]
+
+    def generate_combined_pdf_bytes(self, vector=True, output=None):
+        """One PDF for all courses, each preceded by a divider page. Writes to output if given."""
+        self.report = []
+        buffer = output if output is not None else io.BytesIO()
+        c = canvas.Canvas(buffer, pagesize=A4, bottomup=0)
+        qr_forms = {}
+        for roster in self.rosters:
+            start = time.perf_counter()
+            c.setFont("Helvetica-Bold", 32)
+            c.drawCentredString(A4[0] / 2, A4[1] / 2, f"Kurs: {roster['course']}")
+            c.showPage()
+            pages = self._draw_course(c, roster, vector, qr_forms)
+            c.showPage()
+            self._add_report_row(roster, pages + 1, start)
+        c.save()
+        if output is None:
+            return buffer.getvalue()
+
+    def get_report(self):
+        return self.report
+
+    def _draw_course(self, c, roster, vector, qr_forms):
+        first_page = c.getPageNumber()
+        QRGenerator(roster["students"]).draw_labels(
+            c,
+            roster["students"],
+            roster.get("copies", 1),
+            roster.get("offset_row", 1),
+            roster.get("offset_col", 1),
+            vector,
+            qr_forms
+        )
+        return c.getPageNumber() - first_page + 1
+
+    def _add_report_row(self, roster, pages, start):
+        self.report.append({
+            "course": roster["course"],
+            "students": len(roster["students"]),
+            "labels": len(roster["students"]) * roster.get("copies", 1),
+            "pages": pages,
+            "seconds": round(time.perf_counter() - start, 3)
+        })
@@ -1,49 +1,95 @@
 import io
+import json
+import hashlib
 import zipfile
+import zlib
 import time
+import contextlib
+import tracemalloc
 from datetime import datetime
 import fitz
 import cv2
-import js
 import asyncio
 import traceback
 import numpy as np
-from PyPDF2 import PdfMerger
-from PIL import Image
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import cm
 from reportlab.lib import colors
-from reportlab.pdfgen import canvas
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet
+try:
+    import js
+except ImportError:
+    js = None  # Plain CPython, e.g. when detecting shards in a process pool
 
 class ExamReader : 
-    def __init__(self, pdf_files_data, scan_options):
+    def __init__(self, pdf_files_data, scan_options, log_callback=None):
             
-        options_dict = scan_options.to_py()
-        self.split_a3 = options_dict.get("split_a3", False)
-        self.two_page_scan = options_dict.get("two_page_scan", False)
-        self.quick_and_dirty = options_dict.get("quick_and_dirty", False)
-        self.qr_position_a4 = options_dict.get("qr_position_a4", "vorne")
-        self.qr_position_a3 = options_dict.get("qr_position_a3", "aussen")
+        self._apply_options(scan_options)
+        self.profiler = StageProfiler(self.options.get("profile", False), self._stream_profile_event if self.options.get("profile_stream", False) else None)
             
-        self.pdf_files_data = pdf_files_data
+        if hasattr(pdf_files_data, "to_py") :
+            # Shallow: list of dicts, the file data stays in JavaScript until a PDF is opened
+            pdf_files_data = pdf_files_data.to_py(depth=2)
         
         self.summary = []
         self.missing_pages = []
-        self.log_callback = None  # Will be set by caller (main thread or worker)
+        self.log_callback = log_callback  # Passed in or set by caller (main thread or worker)
         self.progress_callback = None  # Will be set by caller
+        self.student_callback = None  # (file path, pdf bytes, summary row), used with progressive_output
+        self.zip_file = None  # Writable binary file, set by the caller: with stream_output the ZIP goes there instead of memory
+
+        self.last_angle = 0  # Scanner feeder skew is correlated within a batch
+        self.detection_cache = {}  # Page content hash and detection settings -> detection result, reused across option changes
+        self.page_hashes = {}
+        self.page_classes = {}  # Page number -> "blank", "sparse" or "content"
+        self.qr_location_prior = {}  # (page size, orientation) -> relative QR boxes found on earlier pages
+        self.cancel_token = CancellationToken()  # Replaced by the caller to share a flag with the UI
+        self.timed_out_pages = set()
+        self._page_deadline = None
 
         self.logMsg("Reader initialized", "success")
 
-        self.fitz_source_pdf = self._merge_pdf(pdf_files_data)
+        self.source_pdf = self._open_source_pdfs(pdf_files_data)
+        # Only detect_pages_in_pool (CPython) reopens the files. Under Pyodide the data are JavaScript
+        # buffers, keeping them would hold a second copy of every upload next to the one in WASM memory
+        self.pdf_files_data = pdf_files_data if js is None else None
         self.in_memory_files = {} 
+        self.student_page_counts = {}
+        self.output_sizes = {}  # Student -> (estimated bytes without, bytes with optimize_output)
+        self.optimized_images = {}  # (image digest, width, height, settings) -> re-encoded image, shared by student PDFs and summary of one output run
+
+    def _apply_options(self, scan_options) :
+        options_dict = scan_options.to_py() if hasattr(scan_options, "to_py") else dict(scan_options)
+        self.options = options_dict
+        self.split_a3 = options_dict.get("split_a3", False)
+        self.two_page_scan = options_dict.get("two_page_scan", False)
+        self.quick_and_dirty = options_dict.get("quick_and_dirty", False)
+        self.qr_position_a4 = options_dict.get("qr_position_a4", "vorne")
+        self.qr_position_a3 = options_dict.get("qr_position_a3", "aussen")
+        self.render_zoom = options_dict.get("render_zoom", 3)
+        self.skip_blank_pages = options_dict.get("skip_blank_pages", True)
+        self.stream_output = options_dict.get("stream_output", False)
+        self.page_time_budget = options_dict.get("page_time_budget", 0)  # Seconds per page, 0: no limit
+        self.progressive_output = options_dict.get("progressive_output", False)  # Deliver student PDFs during the scan, no ZIP
+        self.optimize_output = options_dict.get("optimize_output", False)  # Recompress page images for smaller uploads
+        self.output_dpi = options_dict.get("output_dpi", 150)
+        self.output_jpeg_quality = options_dict.get("output_jpeg_quality", 60)
+        self.output_color = options_dict.get("output_color", "color")  # "color", "gray" or "bilevel"
+
+    def get_profile_report(self) -> dict:
+        """Per-stage totals and every recorded event, empty unless the "profile" option is set."""
+        return self.profiler.report()
+
+    def _stream_profile_event(self, event) :
+        self.logMsg(json.dumps(event), "profile")
 
     def logMsg(self, msg, type="info"):
-        # Use callback if available (worker mode), otherwise use DOM (main thread mode)
+        # Use callback if available (worker or CLI), otherwise use DOM (main thread mode), otherwise print
         if self.log_callback:
             self.log_callback(msg, type)
-        else:
+            return
+        if js is not None and hasattr(js, "document"):
             try:
                 outputDiv = js.document.getElementById("scan-output")
                 msgElement = js.document.createElement('div')
@@ -52,9 +98,10 @@ class ExamReader :
                 msgElement.innerText = msg
                 outputDiv.appendChild(msgElement)
                 outputDiv.scrollTop = outputDiv.scrollHeight
-            except:
-                # Fallback if DOM not available
-                print(f"[{type}] {msg}")
+                return
+            except Exception:
+                pass
+        print(f"[{type}] {msg}")
         
     async def logMsg_async(self, msg, type="info"):
         self.logMsg(msg, type)
@@ -65,75 +112,264 @@ class ExamReader :
             self.progress_callback(percentage)
         await asyncio.sleep(0)
 
-    async def process(self) -> bool:
+    async def process(self, page_data=None) -> bool:
         # progress_callback should be set by caller before calling process()
+        # page_data: merged result of detect_pages() shards, None scans all pages here
         try:
-            self.pdf_page_array = await self._read_qr_codes()
+            # A cancelled sharded scan must not be taken for a complete result
+            self.cancel_token.raise_if_cancelled()
+            if self.progressive_output and page_data is None :
+                self.pdf_page_array = await self._read_qr_codes_progressive()
+                self._finish_progressive_output()
+                await self.update_progress(1)
+                return True
+
+            self.pdf_page_array = await self._read_qr_codes(page_data)
+            self.student_page_map = self._create_student_page_map()
+
+            if self.progressive_output :
+                # Detected elsewhere (sharded), deliver everything now
+                self.student_page_counts = {}
+                for student in self.student_page_map :
+                    await self._deliver_student(student)
+                self._finish_progressive_output()
+            else :
+                self.saveZipFile()
+            await self.update_progress(1)
+            return True
+
+        except ScanCancelled:
+            self.logMsg("Scan cancelled.", "warning")
+            return False
+
+        except Exception as e:
+            self.logMsg(f"Error: {str(e)}, Stack Trace: {traceback.format_exc()}")
+            return False
+
+
+    async def append_files(self, pdf_files_data) -> bool:
+        """Adds further scan files to the session.
+
+        Only the new pages are detected, and only students whose pages changed get
+        a new PDF. The summary and the ZIP are rebuilt.
+        """
+        try:
+            if hasattr(pdf_files_data, "to_py") :
+                pdf_files_data = pdf_files_data.to_py(depth=2)
+            first_new_page = len(self.source_pdf)
+            self.source_pdf.extend(self._open_source_pdfs(pdf_files_data))
+            if self.pdf_files_data is not None :
+                self.pdf_files_data = list(self.pdf_files_data) + list(pdf_files_data)
+
+            # Earlier pages without detection results (e.g. an interrupted run): scan everything, cached pages are cheap
+            if not hasattr(self, "page_data") or len(self.page_data) != first_new_page :
+                return await self.process()
+
+            new_page_data = await self.detect_pages(first_new_page)
+            previous_map = self.student_page_map
+            self.pdf_page_array = await self._read_qr_codes(self.page_data + new_page_data)
             self.student_page_map = self._create_student_page_map()
 
-            self.saveZipFile()
+            changed = [student for student, pages in self.student_page_map.items()
+                       if self._page_signature(pages) != self._page_signature(previous_map.get(student, []))]
+            await self.logMsg_async(f"{len(pdf_files_data)} file(s) with {len(new_page_data)} page(s) added, {len(changed)} student PDF(s) to rebuild.", "info")
+
+            if self.progressive_output :
+                for student in changed :
+                    await self._deliver_student(student)
+                self._finish_progressive_output()
+            else :
+                self.saveZipFile(changed)
             await self.update_progress(1)
             return True
 
+        except ScanCancelled:
+            self.logMsg("Scan cancelled.", "warning")
+            return False
+
         except Exception as e:
             self.logMsg(f"Error: {str(e)}, Stack Trace: {traceback.format_exc()}")
             return False
 
+    def cancel(self) :
+        """Stops a running scan at the next page or rotation attempt, process() then returns False."""
+        self.cancel_token.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_token.cancelled
+
+    def _page_signature(self, pages) :
+        return [(page["page_num"], page["status"], page["side"]) for page in pages]
+
+    async def reassign(self, scan_options) -> bool:
+        """Re-runs page assignment and output with new options, reusing the cached QR detections."""
+        self._apply_options(scan_options)
+        return await self.process()
+
+    def get_detection_artifact(self) -> str:
+        return json.dumps(self.detection_cache)
+
+    def load_detection_artifact(self, artifact) :
+        if hasattr(artifact, "to_py") :
+            artifact = artifact.to_py()
+        if isinstance(artifact, str) :
+            artifact = json.loads(artifact)
+        self.detection_cache.update(artifact)
 
-    def _merge_pdf(self, input_files) :
-        input_files = input_files.to_py()
+    def uncached_page_count(self) -> int:
+        return sum(1 for page_num in range(len(self.source_pdf)) if self._detection_key(page_num) not in self.detection_cache)
+
+    def _detection_key(self, page_num) -> str:
+        """Cache key of a page: its content hash plus every option that changes what detection finds.
+
+        A "no QR code" result only holds for the settings it was found with.
+        """
+        settings = (self.skip_blank_pages, self.render_zoom, self.page_time_budget)
+        return f"{self._page_hash(page_num)}:{json.dumps(settings)}"
+
+    def _page_hash(self, page_num) -> str:
+        """Hashes the page's content stream and the raw streams of its images and form XObjects."""
+        if page_num in self.page_hashes :
+            return self.page_hashes[page_num]
+
+        page = self.source_pdf[page_num]
+        digest = hashlib.sha1()
+        digest.update(page.read_contents())
+        digest.update(repr(tuple(page.rect)).encode())
+        xrefs = [image[0] for image in page.get_images(full=True)] + [xobject[0] for xobject in page.get_xobjects()]
+        for xref in xrefs :
+            digest.update(page.parent.xref_stream_raw(xref) or b"")
+
+        self.page_hashes[page_num] = digest.hexdigest()
+        return self.page_hashes[page_num]
+
+    def _open_source_pdfs(self, input_files) :
+        if hasattr(input_files, "to_py") :
+            input_files = input_files.to_py(depth=2)
         self.logMsg("Input files converted for Python.", "success")
         
-        merger = PdfMerger()
+        source_pdf = PdfPageIndex()
         for file in input_files :
             try:
-                # File object with binary data
-                file_data = file['data']
-                if hasattr(file_data, 'to_py'):
-                    # Convert Pyodide object to Python
-                    file_data = file_data.to_py()
-                file_buffer = io.BytesIO(bytes(file_data))
-                merger.append(file_buffer)
-                self.logMsg(f"Added file {file.get('name', 'unknown')} to merger", "debug")
+                with self.profiler.stage("open", file=file.get('name', 'unknown')) :
+                    source_pdf.append(fitz.open(stream=self._pdf_stream(file['data']), filetype="pdf"))
+                self.logMsg(f"Opened file {file.get('name', 'unknown')}", "debug")
             except Exception as e:
-                self.logMsg(f"Error processing file in merger: {str(e)}", "error")
+                self.logMsg(f"Error opening file {file.get('name', 'unknown')}: {str(e)}", "error")
                 continue
         
-        merged_buffer = io.BytesIO()
-        merger.write(merged_buffer)
-        merger.close()
-        merged_buffer.seek(0)
-        self.logMsg("PDFs merged in memory", "success")
-        return fitz.open(stream=merged_buffer.getvalue(), filetype="pdf")
-
-    def saveZipFile(self) : 
-        self.summary = []
-        preview_pdf = []
-        for student in self.student_page_map :
-            num_pages, student_file_data = self._create_student_pdf(student)
-            self.summary.append({
-                "Schüler/-in": student.split("_")[0], 
-                "Anzahl Seiten": num_pages}
-            )
-            preview_pdf.append([student, student_file_data])
-        self.summary_data = self._create_summary(preview_pdf)
+        self.logMsg(f"{len(source_pdf)} page(s) indexed from {source_pdf.document_count} file(s)", "success")
+        return source_pdf
+
+    def _pdf_stream(self, file_data) :
+        """Returns file data PyMuPDF opens in place (bytes or memoryview).
+
+        A JavaScript Uint8Array is copied exactly once, into WASM memory.
+        """
+        if hasattr(file_data, "to_bytes") :
+            return file_data.to_bytes()
+        if hasattr(file_data, "to_py") :
+            file_data = file_data.to_py()
+        if isinstance(file_data, (bytes, memoryview)) :
+            return file_data
+        return memoryview(file_data)
+
+    def saveZipFile(self, students=None) : 
+        # students: only rebuild these student PDFs (incremental session), None rebuilds all
+        if self.stream_output :
+            return self._stream_zip_file()
+
+        if students is None :
+            self.in_memory_files.clear()
+            self.student_page_counts = {}
+            students = list(self.student_page_map)
+
+        for student in list(self.student_page_counts) :
+            if student not in self.student_page_map :
+                del self.student_page_counts[student]
+                self.in_memory_files.pop(self._student_file_path(student), None)
+
+        for student in students :
+            self.cancel_token.raise_if_cancelled()
+            num_pages, _ = self._create_student_pdf(student)
+            self.student_page_counts[student] = num_pages
+
+        self.summary = self._summary_rows()
+        self.summary_data = self._create_summary(list(self.student_page_map))
 
         # Create ZIP file in memory
         zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf :
+        with zipfile.ZipFile(zip_buffer, 'w') as zipf :
             for file_path, file_data in self.in_memory_files.items():
-                zipf.writestr(file_path, file_data)
+                self._write_zip_entry(zipf, file_path, file_data)
         
-        zip_buffer.seek(0)
-        self.zip_data = zip_buffer.getvalue()
+        # No copy of the archive, the view keeps the buffer alive
+        self.zip_data = zip_buffer.getbuffer()
         
+        self._log_output_done()
+        return self.zip_data
+
+    def _stream_zip_file(self) :
+        """Writes every student PDF into the archive as soon as it is built and drops it right away.
+
+        At most one student PDF exists outside the archive at a time, instead of
+        all of them next to the finished ZIP. With zip_file set the archive is
+        written to that file and get_zip_bytes() returns None, so only the
+        summary, which shows every page, grows with the class. Otherwise the
+        archive is kept in memory and returned as a view on its buffer. Student
+        PDFs are not kept, so incremental sessions rebuild all of them.
+        """
+        self.in_memory_files.clear()
+        self.student_page_counts = {}
+        summary_fitz = fitz.open()
+
+        zip_buffer = io.BytesIO() if self.zip_file is None else None
+        with zipfile.ZipFile(zip_buffer if zip_buffer is not None else self.zip_file, 'w') as zipf :
+            for student in self.student_page_map :
+                self.cancel_token.raise_if_cancelled()
+                num_pages, pdf_data = self._create_student_pdf(student, keep=False)
+                self.student_page_counts[student] = num_pages
+                self._write_zip_entry(zipf, self._student_file_path(student), pdf_data)
+                self._add_summary_section(summary_fitz, student)
+                del pdf_data
+
+            self.summary = self._summary_rows()
+            self.summary_data = self._save_summary(summary_fitz)
+            self._write_zip_entry(zipf, "summary.pdf", self.summary_data)
+
+        # No copy of the archive, the view keeps the buffer alive
+        self.zip_data = zip_buffer.getbuffer() if zip_buffer is not None else None
+
+        self._log_output_done()
+        return self.zip_data
+
+    def _write_zip_entry(self, zipf, file_path, file_data) :
+        # Scanned PDFs are already compressed, store them unless a sample shrinks noticeably
+        sample = file_data[:256 * 1024]
+        compress_type = zipfile.ZIP_STORED
+        if len(zlib.compress(sample, 1)) < 0.9 * len(sample) :
+            compress_type = zipfile.ZIP_DEFLATED
+        with self.profiler.stage("zip", file=file_path) :
+            zipf.writestr(file_path, file_data, compress_type=compress_type)
+
+    def _summary_rows(self) :
+        return [self._summary_row(student) for student in self.student_page_map]
+
+    def _summary_row(self, student) :
+        return {
+            "Schüler/-in": student.split("_")[0], 
+            "Anzahl Seiten": self.student_page_counts[student]}
+
+    def _log_output_done(self) :
         self.logMsg(f"Done. Created output for {len(self.student_page_map)} students.", "success")
+        size_totals = self._output_size_totals()
+        if size_totals :
+            self.logMsg(f"Student PDFs reduced from {size_totals[0] / 1e6:.1f} MB to {size_totals[1] / 1e6:.1f} MB.", "info")
         # 1. Alert user if there are missing pages
         if hasattr(self, 'missing_pages') and self.missing_pages:
             warning_msg = f"Achtung: {len(self.missing_pages)} Seite(n) konnten keinem Schüler zugeordnet werden: {[p+1 for p in self.missing_pages]}. Bitte Zusammenfassung prüfen."
             self.logMsg(warning_msg, "warning")
-        
-        return self.zip_data
     
     def get_zip_bytes(self):
         if hasattr(self, 'zip_data'):
@@ -143,87 +379,337 @@ class ExamReader :
             return None
             
     def close(self):
-        self.fitz_source_pdf.close()
+        self.source_pdf.close()
         self.in_memory_files.clear()
+        self.optimized_images.clear()
+        self.profiler.close()
             
-    async def _extract_qr_code_from_page (self, page_number : int, dirty : bool):
+    async def _extract_qr_code_from_page (self, page_number : int, dirty : bool, size=None):
+        self._page_deadline = time.perf_counter() + self.page_time_budget if self.page_time_budget else None
+        self.timed_out_pages.discard(page_number)
         img_cv = self._open_page_cv(page_number)
         detector = cv2.QRCodeDetector()
         (h,w) = img_cv.shape[:2]
-        center = (w//2, h//2)
+        prior_key = (size, "landscape" if w > h else "portrait")
 
-        if dirty :
-            angles = [0]
-        else:
-            angles = [0] + [i for i in range(-15, 16) if i != 0]
+        looks_blank = False
+        if self.skip_blank_pages :
+            (page_class, ink, finder_blobs) = self._classify_page(img_cv)
+            self.page_classes[page_number] = page_class
+            await self.logMsg_async(f"Page {page_number+1} classified as {page_class} (ink {ink:.2%}, {finder_blobs} finder-like blob(s)).", "debug")
+            # Still one cheap check at the last angle before the page counts as QR-free
+            looks_blank = page_class != "content"
+            dirty = dirty or looks_blank
+
+        # dirty: single cheap check at the last successful angle, no full-page sweep
+        angles = [self.last_angle] if dirty else self._rotation_angles(img_cv)
+
+        # Learned prior: tight crops where earlier pages of this format had their QR code. Only the
+        # preferred angles, a sheet skewed differently moves its label out of the crop anyway
+        prior_angles = angles[:3]
+        for box in self.qr_location_prior.get(prior_key, []) :
+            crop_box = self._prior_crop_box(box, w, h)
+            result = await self._decode_crop(detector, img_cv, crop_box, prior_angles, page_number, "prior", prior_key)
+            if result :
+                return result
+
+        # Fast path: locate candidates on a downsampled copy, decode only the crops
+        for crop_box in self._find_qr_candidates(img_cv):
+            result = await self._decode_crop(detector, img_cv, crop_box, angles, page_number, "fast", prior_key)
+            if result :
+                return result
+
+        # Fallback: exhaustive sweep over the whole page
+        if not dirty :
+            result = await self._decode_crop(detector, img_cv, (0, 0, w, h), angles, page_number, "full", prior_key)
+            if result :
+                return result
+
+        if self._budget_spent() :
+            self.timed_out_pages.add(page_number)
+            self.detection_stats["timeout"] += 1
+            await self.logMsg_async(f"Page {page_number+1}: time budget of {self.page_time_budget} s spent, QR search stopped.", "warning")
+            return (None, None, None)
+
+        self.detection_stats["blank" if looks_blank else "none"] += 1
+        return (None, None, None)
+
+    def _budget_spent (self) -> bool:
+        return self._page_deadline is not None and time.perf_counter() > self._page_deadline
+
+    def _classify_page (self, img_cv, scale=0.5, sparse_ink=0.03, blank_ink=0.002, min_contrast=40) :
+        """Cheap QR-free check on a downsampled page: returns (class, ink coverage, finder-like blob count).
+
+        Pages without any nested square blob (QR finder pattern) and with little ink
+        are "blank" or "sparse", everything else is "content". Ink is separated
+        from paper halfway between the page's own paper and darkest levels, so
+        light or dark scans are judged alike.
+        """
+        small = self._downsample(img_cv, scale)
+
+        # Median is the paper, a low percentile the ink: a QR code covers well under 1% of a page
+        (dark, paper) = np.percentile(small, (0.05, 50))
+        if paper - dark < min_contrast :
+            return ("blank", 0.0, 0)
+        _, binary = cv2.threshold(small, (dark + paper) / 2, 255, cv2.THRESH_BINARY_INV)
+        ink = cv2.countNonZero(binary) / float(binary.size)
+
+        finder_blobs = 0
+        contours, hierarchy = cv2.findContours(binary, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+        if hierarchy is not None :
+            hierarchy = hierarchy.reshape(-1, 4)
+            for i, contour in enumerate(contours) :
+                child = hierarchy[i][2]
+                if child == -1 or hierarchy[child][2] == -1 :
+                    continue
+                (_, _, bw, bh) = cv2.boundingRect(contour)
+                if bw >= 5 and bh >= 5 and 0.7 < bw / bh < 1.4 :
+                    finder_blobs += 1
+
+        if finder_blobs > 0 or ink >= sparse_ink :
+            return ("content", ink, finder_blobs)
+        return ("blank" if ink < blank_ink else "sparse", ink, finder_blobs)
+
+    async def _decode_crop(self, detector, img_cv, crop_box, angles, page_number, path, prior_key) :
+        (x0, y0, x1, y1) = crop_box
+        (data, points, angle) = await self._decode_with_rotation(detector, img_cv[y0:y1, x0:x1], angles, page_number, path)
+        if data == "" :
+            return None
+        qr_box = (x0 + points[0][:,0].min(), y0 + points[0][:,1].min(), x0 + points[0][:,0].max(), y0 + points[0][:,1].max())
+        return await self._qr_found(page_number, data, qr_box, img_cv.shape[:2], angle, path, prior_key)
+
+    async def _qr_found(self, page_number, data, qr_box, shape, angle, path, prior_key) :
+        (h,w) = shape
+        self.detection_stats[path] += 1
+        self.last_angle = angle
+        self._remember_qr_location(prior_key, qr_box, w, h)
+        await self.logMsg_async(f"QR-Code on page {page_number+1} read. Student: {data.split('_')[0]}{f' (angle {angle})' if angle != 0 else ''} [{path}]", "info")
+        data = data.replace("Teilnehmer/in", "")
+        cx = (qr_box[0] + qr_box[2]) / 2
+        side = "left" if cx < w/2 else "right"
+        return (data, side, angle)
+
+    def _remember_qr_location(self, prior_key, qr_box, w, h, max_locations=4) :
+        """Stores the QR box relative to the page size, most recent location first."""
+        box = (float(qr_box[0] / w), float(qr_box[1] / h), float(qr_box[2] / w), float(qr_box[3] / h))
+        centre = ((box[0] + box[2]) / 2, (box[1] + box[3]) / 2)
+        locations = [known for known in self.qr_location_prior.get(prior_key, [])
+                     if abs((known[0] + known[2]) / 2 - centre[0]) > 0.1 or abs((known[1] + known[3]) / 2 - centre[1]) > 0.1]
+        self.qr_location_prior[prior_key] = [box] + locations[:max_locations - 1]
+
+    def _prior_crop_box(self, box, w, h, padding=0.25) :
+        pad_x = (box[2] - box[0]) * padding
+        pad_y = (box[3] - box[1]) * padding
+        return (
+            max(0, int((box[0] - pad_x) * w)), max(0, int((box[1] - pad_y) * h)),
+            min(w, int((box[2] + pad_x) * w)), min(h, int((box[3] + pad_y) * h))
+        )
+
+    def _rotation_angles (self, img_cv, max_angle=15) :
+        """Orders the rotation attempts: last successful angle, estimated skew and its neighbours, then the rest."""
+        preferred = [self.last_angle]
+        skew = self._estimate_skew(img_cv, max_angle=max_angle)
+        if skew is not None :
+            estimate = int(round(skew))
+            preferred += [estimate, estimate - 1, estimate + 1]
+        preferred.append(0)
+
+        angles = []
+        for angle in preferred + list(range(-max_angle, max_angle + 1)) :
+            if -max_angle <= angle <= max_angle and angle not in angles :
+                angles.append(angle)
+        return angles
+
+    def _estimate_skew (self, img_cv, scale=0.25, max_angle=15) :
+        """Estimates the page skew in degrees from the dominant near-horizontal line orientation."""
+        small = self._downsample(img_cv, scale)
+
+        edges = cv2.Canny(small, 50, 150)
+        lines = cv2.HoughLinesP(edges, 1, np.pi / 360, threshold=50, minLineLength=small.shape[1] // 6, maxLineGap=5)
+        if lines is None :
+            return None
+
+        angles = []
+        for x1, y1, x2, y2 in lines.reshape(-1, 4) :
+            angle = np.degrees(np.arctan2(y2 - y1, x2 - x1))
+            if angle > 90 :
+                angle -= 180
+            elif angle < -90 :
+                angle += 180
+            if abs(angle) <= max_angle :
+                angles.append(angle)
+
+        if not angles :
+            return None
+        return float(np.median(angles))
+
+    async def _decode_with_rotation (self, detector, img, angles, page_number=None, path=None) :
+        (h,w) = img.shape[:2]
+        center = (w//2, h//2)
         for angle in angles :
-            matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
-            rotated = cv2.warpAffine(img_cv, matrix, (w,h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+            # Lets the worker handle a cancel message between attempts
+            await asyncio.sleep(0)
+            self.cancel_token.raise_if_cancelled()
+            if self._budget_spent() :
+                break
+            if angle == 0 :
+                rotated = img
+            else :
+                matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+                rotated = cv2.warpAffine(img, matrix, (w,h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
 
-            data, points, _ = detector.detectAndDecode(rotated)
-            if data == "" :
+            try :
+                with self.profiler.stage("decode", page=page_number, path=path, angle=angle) :
+                    data, points, _ = detector.detectAndDecode(rotated)
+            except cv2.error :
+                # OpenCV asserts on some degenerate contours of blurred scans, count it as no QR code
                 continue
-            
-            await self.logMsg_async(f"QR-Code on page {page_number+1} read. Student: {data.split('_')[0]}{f' (angle {angle})' if angle != 0 else ''}", "info")
-            data = data.replace("Teilnehmer/in", "")
+            if data != "" and points is not None :
+                return (data, points, angle)
+        return ("", None, None)
 
-            cx = int(points[0][:,0].mean())
-            side = "left" if cx < w/2 else "right"
-            return (data, side)
-            
-        return (None, None)
+    def _downsample (self, img_cv, scale) :
+        # Page images are grayscale since they are rendered or decoded as such
+        (h,w) = img_cv.shape[:2]
+        return cv2.resize(img_cv, (int(w*scale), int(h*scale)), interpolation=cv2.INTER_AREA)
+
+    def _find_qr_candidates (self, img_cv, scale=0.25, max_candidates=3) :
+        """Returns full-resolution crop boxes (x0, y0, x1, y1) that likely contain a QR code."""
+        (h,w) = img_cv.shape[:2]
+        small = self._downsample(img_cv, scale)
+
+        boxes = []
+        try :
+            found, points = cv2.QRCodeDetector().detect(small)
+        except cv2.error :
+            found, points = False, None
+        if found and points is not None :
+            xs, ys = points[0][:,0], points[0][:,1]
+            boxes.append((xs.min(), ys.min(), xs.max(), ys.max()))
+
+        # Dense dark square blobs are QR candidates even when the small-scale detector fails
+        _, binary = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+        closed = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+        contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        min_side = min(small.shape[:2]) * 0.04
+        max_side = min(small.shape[:2]) * 0.4
+        blobs = []
+        for contour in contours :
+            bx, by, bw, bh = cv2.boundingRect(contour)
+            if bw < min_side or bh < min_side or bw > max_side or bh > max_side :
+                continue
+            if not 0.7 < bw / bh < 1.4 :
+                continue
+            fill = cv2.countNonZero(binary[by:by+bh, bx:bx+bw]) / float(bw * bh)
+            if not 0.3 < fill < 0.8 :
+                continue
+            blobs.append((bw * bh, (bx, by, bx + bw, by + bh)))
+        blobs.sort(reverse=True)
+        boxes.extend(box for _, box in blobs)
+
+        crops = []
+        for (x0, y0, x1, y1) in boxes[:max_candidates] :
+            pad = max(x1 - x0, y1 - y0) * 0.35
+            crops.append((
+                max(0, int((x0 - pad) / scale)), max(0, int((y0 - pad) / scale)),
+                min(w, int((x1 + pad) / scale)), min(h, int((y1 + pad) / scale))
+            ))
+        return crops
 
     def _open_page_cv (self, page_number) :
-        zoom = 3
-        mat = fitz.Matrix(zoom, zoom)
-        pix = self.fitz_source_pdf.load_page(page_number).get_pixmap(matrix=mat)
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        return cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR) 
+        with self.profiler.stage("render", page=page_number) :
+            return self._render_page_cv(page_number)
+
+    def _render_page_cv (self, page_number) :
+        page = self.source_pdf.load_page(page_number)
+        pix = self._embedded_page_pixmap(page)
+        if pix is None :
+            mat = fitz.Matrix(self.render_zoom, self.render_zoom)
+            pix = page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY, alpha=False)
+        # The array is a view on the pixmap buffer, keep the pixmap alive until the next render
+        self._page_pixmap = pix
+        samples = pix.samples_mv if hasattr(pix, "samples_mv") else pix.samples
+        img = np.frombuffer(samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+        return img[:, :pix.width]
         
+    def _embedded_page_pixmap (self, page) :
+        """Decodes the page's scan image at native resolution if the page is a single upright full-page image, otherwise returns None."""
+        images = page.get_images(full=True)
+        if len(images) != 1 or page.rotation != 0 :
+            return None
+
+        xref = images[0][0]
+        placements = page.get_image_rects(xref, transform=True)
+        if len(placements) != 1 :
+            return None
+        (rect, matrix) = placements[0]
+        if matrix.b != 0 or matrix.c != 0 or matrix.a <= 0 or matrix.d <= 0 :
+            return None
+        if abs(rect & page.rect) < 0.95 * abs(page.rect) or page.get_drawings() :
+            return None
+
+        try :
+            pix = fitz.Pixmap(page.parent, xref)
+            if pix.alpha :
+                pix = fitz.Pixmap(pix, 0)
+            if pix.n != 1 :
+                pix = fitz.Pixmap(fitz.csGRAY, pix)
+        except Exception as e :
+            self.logMsg(f"Embedded image on page {page.number+1} could not be decoded, rendering instead: {str(e)}", "debug")
+            return None
+        return pix
+
     def get_summary_bytes(self) -> bytes:
         return self.summary_data
     
-    def _fitz_add_data(self, total_fitz, pdf_data) :
-        fitz_add = fitz.open(stream=pdf_data, filetype="pdf")
-        total_fitz.insert_pdf(fitz_add, from_page=0, to_page=len(fitz_add))
-        fitz_add.close()
-    
-    def _create_summary (self, preview_pdf) :
-        summary = self.summary
-        summary_title_data = self._build_summary_page()
+    def _create_summary (self, students) :
         summary_fitz = fitz.open()
-        self._fitz_add_data(summary_fitz, summary_title_data)
+        for student in students :
+            self._add_summary_section(summary_fitz, student)
+        return self._save_summary(summary_fitz)
+
+    def _add_summary_section (self, summary_fitz, student) :
+        # Built from the source pages, the finished student PDF is never re-parsed
+        with self.profiler.stage("summary", student=student) :
+            self._add_separator_page(summary_fitz, f"Schüler/-in: {student.split('_')[0]}")
+            self._assemble_student_pages(summary_fitz, student, verbose=False)
+
+    def _add_separator_page (self, target_fitz, text, position=-1) :
+        font_size = 32
+        page = target_fitz.new_page(pno=position, width=A4[0], height=A4[1])
+        text_width = fitz.get_text_length(text, fontname="hebo", fontsize=font_size)
+        page.insert_text(((A4[0] - text_width) / 2, A4[1] / 2), text, fontname="hebo", fontsize=font_size)
+
+    def _save_summary (self, summary_fitz) :
+        with self.profiler.stage("summary") :
+            return self._finish_summary(summary_fitz)
+
+    def _finish_summary (self, summary_fitz) :
+        # Title page and missing pages go in front of the student sections
+        summary_title_data = self._build_summary_page()
+        summary_title_fitz = fitz.open(stream=summary_title_data, filetype="pdf")
+        summary_fitz.insert_pdf(summary_title_fitz, start_at=0)
+        front_pages = len(summary_title_fitz)
+        summary_title_fitz.close()
 
         if hasattr(self, 'missing_pages') and self.missing_pages:
-            missing_name_buffer = io.BytesIO()
-            c = canvas.Canvas(missing_name_buffer, pagesize=A4)
-            c.setFont("Helvetica-Bold", 32)
-            c.drawCentredString(A4[0]/2, A4[1]/2, "Nicht eingelesene Seiten")
-            c.save()
-            missing_name_buffer.seek(0)
-            self._fitz_add_data(summary_fitz, missing_name_buffer.getvalue())
+            self._add_separator_page(summary_fitz, "Nicht eingelesene Seiten", position=front_pages)
+            front_pages += 1
 
             for missing_page_num in self.missing_pages:
-                summary_fitz.insert_pdf(self.fitz_source_pdf, from_page=missing_page_num, to_page=missing_page_num)
-
-        for (student, pdf_data) in preview_pdf :
-            name_page_buffer = io.BytesIO()
-            c = canvas.Canvas(name_page_buffer, pagesize=A4)
-            c.setFont("Helvetica-Bold", 32)
-            c.drawCentredString(A4[0]/2, A4[1]/2, f"Schüler/-in: {student.split('_')[0]}")
-            c.save()
-            name_page_buffer.seek(0)
-            self._fitz_add_data(summary_fitz, name_page_buffer.getvalue())
-            self._fitz_add_data(summary_fitz, pdf_data)
-
-        summary_buffer = io.BytesIO()
-        summary_fitz.save(summary_buffer)
+                (document, local_page) = self.source_pdf.locate(missing_page_num)
+                summary_fitz.insert_pdf(document, from_page=local_page, to_page=local_page, start_at=front_pages)
+                front_pages += 1
+
+        summary_data = self._save_output_pdf(summary_fitz)
         summary_fitz.close()
-        summary_buffer.seek(0)
-        summary_data = summary_buffer.getvalue()
+        # Every output PDF of this run is built, the re-encoded images are not needed any more
+        self.optimized_images.clear()
         
         # Store in in_memory_files for ZIP creation
-        self.in_memory_files["summary.pdf"] = summary_data
+        if not self.stream_output :
+            self.in_memory_files["summary.pdf"] = summary_data
         return summary_data
         
     
@@ -268,56 +754,177 @@ class ExamReader :
         else :
             elements.append(Paragraph(f"<b>Alle Seiten zugeordnet.</b>", styles['Normal']))
 
+        size_totals = self._output_size_totals()
+        if size_totals :
+            (before, after) = size_totals
+            color_names = {"color": "Farbe", "gray": "Graustufen", "bilevel": "Schwarz-Weiß"}
+            elements.append(Spacer(1, 0.3*cm))
+            elements.append(Paragraph(
+                f"<b>Größe der Schüler-PDFs:</b> {before / 1e6:.1f} MB vor, {after / 1e6:.1f} MB nach der Optimierung "
+                f"({self.output_dpi} dpi, JPEG-Qualität {self.output_jpeg_quality}, {color_names.get(self.output_color, self.output_color)})",
+                styles['Normal']))
+
         doc.build(elements)
         output_buffer.seek(0)
         return output_buffer.getvalue()
     
-    def _create_student_pdf(self, student : str) -> int :
+    def _create_student_pdf(self, student : str, keep=True) -> int :
+        with self.profiler.stage("student_pdf", student=student) :
+            return self._build_student_pdf(student, keep)
+
+    def _build_student_pdf(self, student : str, keep=True) -> int :
+        if self.stream_output or self.progressive_output :
+            # Memory-bounded output: only the current student's images are kept, the summary re-encodes its own
+            self.optimized_images.clear()
         output_pdf = fitz.open()
+        num_pages = self._assemble_student_pages(output_pdf, student)
+        
+        # Save to memory buffer instead of file
+        pdf_data = self._save_output_pdf(output_pdf, student)
+        output_pdf.close()
+        
+        # Store in in_memory_files for ZIP creation
+        if keep :
+            self.in_memory_files[self._student_file_path(student)] = pdf_data
+        
+        return [num_pages, pdf_data]
+
+    def _save_output_pdf(self, output_pdf, student=None) -> bytes :
+        """Returns the bytes of an assembled output PDF, with optimize_output its page images are
+        recompressed and the file is garbage-collected and deflated."""
+        # tobytes() hands over its save buffer: BytesIO.getvalue() without a view on it shrinks and
+        # returns the buffer itself instead of copying, and keeps no over-allocation alive
+        if not self.optimize_output :
+            return output_pdf.tobytes()
+
+        with self.profiler.stage("optimize", student=student) :
+            (images_before, images_after) = self._recompress_images(output_pdf)
+            pdf_data = output_pdf.tobytes(garbage=3, deflate=True)
+        if student is not None :
+            # Without optimize_output the file would hold the original images instead
+            self.output_sizes[student] = (len(pdf_data) - images_after + images_before, len(pdf_data))
+        return pdf_data
+
+    def _recompress_images(self, output_pdf) :
+        """Downsamples page images to output_dpi and re-encodes them in place, returns their total size before and after.
+
+        Every image is handled once, however many pages show it. Images with a
+        mask, and those that would not get smaller, are kept as they are.
+        """
+        shown_sizes = {}  # xref -> (digest, largest width and height shown on a page in inches)
+        for page in output_pdf :
+            for info in page.get_image_info(hashes=True, xrefs=True) :
+                if info["xref"] == 0 or info["has-mask"] :
+                    continue
+                (a, b, c, d, _, _) = info["transform"]
+                (digest, width, height) = shown_sizes.get(info["xref"], (info["digest"], 0, 0))
+                shown_sizes[info["xref"]] = (digest, max(width, np.hypot(a, b) / 72), max(height, np.hypot(c, d) / 72))
+
+        settings = (self.output_dpi, self.output_jpeg_quality, self.output_color)
+        images_before = images_after = 0
+        for (xref, (digest, width, height)) in shown_sizes.items() :
+            self.cancel_token.raise_if_cancelled()
+            raw_size = len(output_pdf.xref_stream_raw(xref))
+            images_before += raw_size
+            if output_pdf.xref_get_key(xref, "ImageMask")[1] == "true" :
+                images_after += raw_size
+                continue
+
+            key = (digest, max(1, round(width * self.output_dpi)), max(1, round(height * self.output_dpi)), settings)
+            if key not in self.optimized_images :
+                self.optimized_images[key] = self._encode_output_image(output_pdf, xref, key[1], key[2], raw_size)
+            encoded = self.optimized_images[key]
+            if encoded is None :
+                images_after += raw_size
+                continue
+
+            (stream, pdf_keys) = encoded
+            output_pdf.update_stream(xref, stream, compress=False)
+            for (name, value) in pdf_keys.items() :
+                output_pdf.xref_set_key(xref, name, value)
+            images_after += len(stream)
+        return (images_before, images_after)
+
+    def _encode_output_image(self, output_pdf, xref, width, height, raw_size) :
+        """Re-encodes one image at width x height pixels at most, as JPEG or as 1-bit Flate for "bilevel".
+
+        Returns (stream, image dictionary entries), or None if the result is not smaller than raw_size.
+        """
+        pix = fitz.Pixmap(output_pdf, xref)
+        if pix.alpha :
+            pix = fitz.Pixmap(pix, 0)
+        if self.output_color != "color" and pix.n != 1 :
+            pix = fitz.Pixmap(fitz.csGRAY, pix)
+        elif pix.n not in (1, 3) :
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+
+        img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+        if pix.n == 1 :
+            img = img[:, :, 0]
+        if width < pix.width or height < pix.height :
+            img = cv2.resize(img, (min(width, pix.width), min(height, pix.height)), interpolation=cv2.INTER_AREA)
+
+        if self.output_color == "bilevel" :
+            (_, img) = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+            stream = zlib.compress(np.packbits(img > 127, axis=1).tobytes(), 9)
+            pdf_keys = {"Filter": "/FlateDecode", "ColorSpace": "/DeviceGray", "BitsPerComponent": "1"}
+        else :
+            if pix.n == 3 :
+                img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+            (_, jpeg) = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, self.output_jpeg_quality, cv2.IMWRITE_JPEG_OPTIMIZE, 1])
+            stream = jpeg.tobytes()
+            pdf_keys = {"Filter": "/DCTDecode", "ColorSpace": "/DeviceGray" if img.ndim == 2 else "/DeviceRGB", "BitsPerComponent": "8"}
+
+        if len(stream) >= raw_size :
+            return None
+        pdf_keys.update({"Width": str(img.shape[1]), "Height": str(img.shape[0]), "DecodeParms": "null", "Decode": "null"})
+        return (stream, pdf_keys)
+
+    def _output_size_totals(self) :
+        """(bytes without, bytes with optimize_output) summed over the current students, or None."""
+        sizes = [self.output_sizes[student] for student in self.student_page_map if student in self.output_sizes]
+        if not self.optimize_output or not sizes :
+            return None
+        return (sum(before for (before, _) in sizes), sum(after for (_, after) in sizes))
+
+    def _assemble_student_pages(self, output_pdf, student : str, verbose=True) -> int :
+        """Appends the student's source pages (split A3 sheets as A4 halves) to output_pdf, returns the number of pages added."""
         pdf_manager = PdfManager()
+        first_page = len(output_pdf)
         i=0
 
         while (i < len(self.student_page_map[student])):
             page = self.student_page_map[student][i]
             if not self.split_a3 or not page["size"] == "A3" or not i + 1 < len(self.student_page_map[student]):
-                output_pdf.insert_pdf(self.fitz_source_pdf, from_page=page["page_num"], to_page=page["page_num"])
+                self.source_pdf.insert_page(output_pdf, page["page_num"])
                 i+=1
                 continue
 
             next_page = self.student_page_map[student][i+1]
             if pdf_manager.is_splittable_pair(page, next_page) :
-                self.logMsg(f"Pages {page['page_num']+1} and {next_page['page_num']+1} will be split.", "info")
-                (output_page4, output_page1) = pdf_manager.split_a3(self.fitz_source_pdf, page["page_num"])
-                (output_page2, output_page3) = pdf_manager.split_a3(self.fitz_source_pdf, next_page["page_num"])
-
-                for page in (output_page1, output_page2, output_page3, output_page4) :
-                    output_pdf.insert_pdf(page)
-                    page.close()
+                if verbose :
+                    self.logMsg(f"Pages {page['page_num']+1} and {next_page['page_num']+1} will be split.", "info")
+                (outside_pdf, outside_page) = self.source_pdf.locate(page["page_num"])
+                (inside_pdf, inside_page) = self.source_pdf.locate(next_page["page_num"])
+                # Outside sheet is 4|1, inside sheet 2|3
+                for (document, local_page, side) in ((outside_pdf, outside_page, "right"), (inside_pdf, inside_page, "left"),
+                                                     (inside_pdf, inside_page, "right"), (outside_pdf, outside_page, "left")) :
+                    pdf_manager.append_a3_half(output_pdf, document, local_page, side)
                 i+=2
                 continue
 
             else :
-                output_pdf.insert_pdf(self.fitz_source_pdf, from_page=page["page_num"], to_page=page["page_num"])
+                self.source_pdf.insert_page(output_pdf, page["page_num"])
                 i+=1
                 continue
 
-        num_pages = len(output_pdf)
+        return len(output_pdf) - first_page
+
+    def _student_file_path(self, student) :
         # Format: Participant_6028356_assignsubmission_file_
         student_id = student.split("_")[1]
         student_folder = "Participant_" + student_id + "_assignsubmission_file_"
-        
-        # Save to memory buffer instead of file
-        output_buffer = io.BytesIO()
-        output_pdf.save(output_buffer)
-        output_pdf.close()
-        output_buffer.seek(0)
-        pdf_data = output_buffer.getvalue()
-        
-        # Store in in_memory_files for ZIP creation
-        output_file_path = f"{student_folder}/{student}.pdf"
-        self.in_memory_files[output_file_path] = pdf_data
-        
-        return [num_pages, pdf_data]
+        return f"{student_folder}/{student}.pdf"
             
 
     def _qr_on_back(self, page_size) :
@@ -326,76 +933,226 @@ class ExamReader :
         else :
             return self.qr_position_a4 == "hinten"
 
-    async def _read_qr_codes(self) :
-        pages_info = []
-        total_pages = len(self.fitz_source_pdf)
-        self.missing_pages = []
+    async def detect_pages(self, start=0, stop=None, on_page=None) :
+        """First pass: reads pages [start, stop) and detects QR codes.
+
+        Returns one plain dict per page, so shards scanned by several workers or
+        processes can be concatenated and handed to process(). on_page is awaited
+        with the pages detected so far after every page.
+        """
+        total_pages = len(self.source_pdf)
+        stop = total_pages if stop is None else min(stop, total_pages)
+        self.detection_stats = {"prior": 0, "fast": 0, "full": 0, "blank": 0, "none": 0, "timeout": 0, "cached": 0}
         pdf_manager = PdfManager()
 
-        # First pass: read all pages and detect QR codes
+        # quick_and_dirty: pages predicted to be QR-free only get a single cheap check
+        scheduler = ParityScheduler() if self.quick_and_dirty and self.two_page_scan else None
+
         page_data = []
-        for page_num in range(total_pages):
-            size = pdf_manager.detect_page_size(self.fitz_source_pdf[page_num])
+        for page_num in range(start, stop):
+            self.cancel_token.raise_if_cancelled()
+            size = pdf_manager.detect_page_size(self.source_pdf[page_num])
             qr_on_back = self._qr_on_back(size)
             
-            dirty = False
-            if self.quick_and_dirty and self.two_page_scan:
-                dirty = (page_data and page_data[-1].get('qr')) or (qr_on_back and page_num == 0)
-            
-            (qr, side) = await self._extract_qr_code_from_page(page_num, dirty)
-            page_data.append({"page_num": page_num, "size": size, "qr": qr, "side": side, "qr_on_back": qr_on_back})
+            dirty = scheduler is not None and not scheduler.expects_qr(page_num, qr_on_back)
+            page = await self._detect_page(page_num, size, qr_on_back, dirty)
+
+            # Expected QR missing after a cheaply checked page: parity may have shifted, re-check that page fully
+            if scheduler is not None and not dirty and not page["qr"] and page_data and not page_data[-1]["qr"] and not page_data[-1]["exhaustive"] :
+                previous = page_data[-1]
+                await self.logMsg_async(f"Expected QR code missing on page {page_num+1}, re-checking page {previous['page_num']+1} with full search.", "debug")
+                page_data[-1] = await self._detect_page(previous["page_num"], previous["size"], previous["qr_on_back"], False)
+                scheduler.record(page_data[-1]["qr"] is not None)
+
+            page_data.append(page)
+            if scheduler is not None :
+                scheduler.record(page["qr"] is not None)
+            if on_page is not None :
+                await on_page(page_data)
             
             if self.progress_callback:
-                await self.update_progress((page_num + 1) / (total_pages + 1) * 0.8)  # 80% for scanning
+                await self.update_progress((page_num - start + 1) / (stop - start + 1) * 0.8)  # 80% for scanning
+
+        await self.logMsg_async(f"QR detection: {self.detection_stats['prior']} page(s) at a known QR location, {self.detection_stats['fast']} via candidate crops, {self.detection_stats['full']} via full-page sweep, {self.detection_stats['blank']} blank or near-empty, {self.detection_stats['none']} without QR code, {self.detection_stats['timeout']} over the time budget, {self.detection_stats['cached']} from cache.", "debug")
+        return page_data
+
+    async def _detect_page(self, page_num, size, qr_on_back, dirty) :
+        cache_key = self._detection_key(page_num)
+        cached = self.detection_cache.get(cache_key)
+        if cached and (cached["qr"] or cached["exhaustive"] or dirty) :
+            (qr, side, angle) = (cached["qr"], cached["side"], cached["angle"])
+            self.page_classes[page_num] = cached.get("page_class")
+            exhaustive = cached["exhaustive"]
+            self.detection_stats["cached"] += 1
+        else :
+            (qr, side, angle) = await self._extract_qr_code_from_page(page_num, dirty, size)
+            exhaustive = not dirty
+            # A search cut short by the time budget is not a result, try again on the next run
+            if page_num not in self.timed_out_pages :
+                self.detection_cache[cache_key] = {"size": size, "qr": qr, "side": side, "angle": angle, "exhaustive": exhaustive, "page_class": self.page_classes.get(page_num)}
+        timed_out = qr is None and page_num in self.timed_out_pages
+        return {"page_num": page_num, "hash": cache_key, "size": size, "qr": qr, "side": side, "angle": angle, "qr_on_back": qr_on_back, "exhaustive": exhaustive, "page_class": self.page_classes.get(page_num), "timed_out": timed_out}
+
+    def detect_pages_in_pool(self, workers) :
+        """Runs the first pass in a CPython process pool, one reader per page shard.
+
+        Shard readers start from this reader's detection cache, so cached pages
+        are not scanned again. The log messages of each shard are collected in
+        the child process and logged here once the shard is done.
+        """
+        # Imported here, the browser never runs a process pool
+        from concurrent.futures import ProcessPoolExecutor
+
+        ranges = shard_page_ranges(len(self.source_pdf), workers)
+        if not ranges :
+            return []
+        # memoryviews cannot be pickled
+        pdf_files_data = [{"name": file.get("name", "unknown"), "data": bytes(self._pdf_stream(file["data"]))} for file in self.pdf_files_data]
+        with ProcessPoolExecutor(max_workers=len(ranges)) as pool :
+            futures = [pool.submit(_detect_shard, pdf_files_data, self.options, start, stop, self.detection_cache) for (start, stop) in ranges]
+            shards = []
+            for future in futures :
+                (page_data, messages) = future.result()
+                for (msg, type) in messages :
+                    self.logMsg(msg, type)
+                shards.append(page_data)
+            return merge_page_data(shards)
+
+    async def _read_qr_codes(self, page_data=None) :
+        self.cancel_token.raise_if_cancelled()
+        self.missing_pages = []
+
+        # First pass: read all pages and detect QR codes, unless shards were detected elsewhere
+        if page_data is None :
+            page_data = await self.detect_pages()
+        else :
+            if hasattr(page_data, "to_py") :
+                page_data = page_data.to_py()
+            for page in page_data :
+                if page.get("timed_out") :
+                    continue
+                self.detection_cache[page["hash"]] = {key: page.get(key) for key in ("size", "qr", "side", "angle", "exhaustive", "page_class")}
+
+        self.page_data = page_data
 
         # Second pass: assign pages to students based on QR position settings
-        for i, page in enumerate(page_data):
-            qr_on_back = page["qr_on_back"]
-            
-            if page["qr"]:
-                pages_info.append({
-                    "page_num": page["page_num"], 
-                    "size": page["size"], 
-                    "status": "read", 
-                    "value": page["qr"], 
-                    "side": page["side"]
-                })                   
-            
-            elif self.two_page_scan:
-                if qr_on_back:
-                    if i + 1 < len(page_data) and page_data[i + 1]["qr"]:
-                        next_qr = page_data[i + 1]["qr"]
-                        page_info = {"page_num": page["page_num"], "size": page["size"],
-                                    "status": "from_next", "value": next_qr, "side": "none"}
-                        await self.logMsg_async(f"No QR code on page {page['page_num']+1}. Inferred from next page.", "info")
-                        pages_info.append(page_info)
-                    else:
-                        await self.logMsg_async(f"Error on page {page['page_num']+1}: No QR code found and next page has no QR code either.", "error")
-                        self.missing_pages.append(page["page_num"])
-                else:
-                    if i > 0 and page_data[i - 1]["qr"]:
-                        prev_qr = page_data[i - 1]["qr"]
-                        page_info = {"page_num": page["page_num"], "size": page["size"],
-                                    "status": "from_previous", "value": prev_qr, "side": "none"}
-                        await self.logMsg_async(f"No QR code on page {page['page_num']+1}. Inferred from previous page.", "info")
-                        pages_info.append(page_info)
-                    else:
-                        await self.logMsg_async(f"Error on page {page['page_num']+1}: No QR code and previous page has no QR code either.", "error")
-                        self.missing_pages.append(page["page_num"])
-            else:
-                await self.logMsg_async(f"Read error: Page {page['page_num']+1} has no QR-Code and option two_page_scan is not active.", "error")
-                self.missing_pages.append(page["page_num"])
-            
-            if self.progress_callback:
-                await self.update_progress((page_num+1)/(total_pages+1))
+        with self.profiler.stage("assign", pages=len(page_data)) :
+            pages_info = await self._assign_pages(page_data)
+
+        await self._log_assignment_result()
+        return pages_info
 
+    async def _log_assignment_result(self) :
         if len(self.missing_pages) > 0:
             await self.logMsg_async("Some pages could not be assigned: " + str([i+1 for i in self.missing_pages]), "error")
         else:
             await self.logMsg_async("All QR codes read.", "info")
-        return pages_info
-    
+
+    async def _assign_pages(self, page_data) :
+        pages_info = []
+        for i in range(len(page_data)):
+            self.cancel_token.raise_if_cancelled()
+            page_info = await self._assign_page(page_data, i)
+            if page_info :
+                pages_info.append(page_info)
             
+            if self.progress_callback:
+                await self.update_progress(0.8 + 0.1 * (i + 1) / len(page_data))
+
+        return pages_info
+
+    async def _assign_page(self, page_data, i) :
+        """Assigns page_data[i] using its own QR code or a neighbour's, returns None for a missing page."""
+        page = page_data[i]
+        qr_on_back = self._qr_on_back(page["size"])
+        
+        if page["qr"]:
+            return {
+                "page_num": page["page_num"], 
+                "size": page["size"], 
+                "status": "read", 
+                "value": page["qr"], 
+                "side": page["side"]
+            }
+        
+        elif page.get("timed_out"):
+            # Not inferred from a neighbour: the page may well carry a different QR code
+            await self.logMsg_async(f"Error on page {page['page_num']+1}: QR search exceeded the time budget.", "error")
+
+        elif self.two_page_scan:
+            if qr_on_back:
+                if i + 1 < len(page_data) and page_data[i + 1]["qr"]:
+                    next_qr = page_data[i + 1]["qr"]
+                    await self.logMsg_async(f"No QR code on page {page['page_num']+1}. Inferred from next page.", "info")
+                    return {"page_num": page["page_num"], "size": page["size"],
+                            "status": "from_next", "value": next_qr, "side": "none"}
+                await self.logMsg_async(f"Error on page {page['page_num']+1}: No QR code found and next page has no QR code either.", "error")
+            else:
+                if i > 0 and page_data[i - 1]["qr"]:
+                    prev_qr = page_data[i - 1]["qr"]
+                    await self.logMsg_async(f"No QR code on page {page['page_num']+1}. Inferred from previous page.", "info")
+                    return {"page_num": page["page_num"], "size": page["size"],
+                            "status": "from_previous", "value": prev_qr, "side": "none"}
+                await self.logMsg_async(f"Error on page {page['page_num']+1}: No QR code and previous page has no QR code either.", "error")
+        else:
+            await self.logMsg_async(f"Read error: Page {page['page_num']+1} has no QR-Code and option two_page_scan is not active.", "error")
+
+        self.missing_pages.append(page["page_num"])
+        return None
+
+    async def _read_qr_codes_progressive(self) :
+        """Detection and assignment interleaved, each student is delivered as soon as a later page belongs to someone else.
+
+        A page is final once the next page has been detected (the scheduler may
+        re-check it), and its assignment also needs the next page, so assignment
+        runs two pages behind detection. A student who shows up again later is
+        delivered again with all pages.
+        """
+        self.missing_pages = []
+        self.student_page_map = {}
+        self.student_page_counts = {}
+        pages_info = []
+        assigned = 0
+        open_student = None
+
+        async def assign_until(stop, page_data) :
+            nonlocal assigned, open_student
+            while assigned < stop :
+                page_info = await self._assign_page(page_data, assigned)
+                assigned += 1
+                if not page_info :
+                    continue
+                pages_info.append(page_info)
+                student = page_info["value"]
+                self.student_page_map.setdefault(student, []).append(page_info)
+                if open_student is not None and open_student != student :
+                    await self._deliver_student(open_student)
+                open_student = student
+
+        page_data = await self.detect_pages(on_page=lambda page_data: assign_until(len(page_data) - 2, page_data))
+        self.page_data = page_data
+        await assign_until(len(page_data), page_data)
+        if open_student is not None :
+            await self._deliver_student(open_student)
+
+        await self._log_assignment_result()
+        return pages_info
+
+    async def _deliver_student(self, student) :
+        """Builds the student's PDF and hands it to student_callback right away, it is not kept."""
+        num_pages, pdf_data = self._create_student_pdf(student, keep=False)
+        self.student_page_counts[student] = num_pages
+        if self.student_callback :
+            self.student_callback(self._student_file_path(student), pdf_data, self._summary_row(student))
+        await self.logMsg_async(f"PDF for {student.split('_')[0]} delivered ({num_pages} page(s)).", "debug")
+
+    def _finish_progressive_output(self) :
+        # Student PDFs are already delivered, the caller builds the archive from them and the summary
+        self.summary = self._summary_rows()
+        self.summary_data = self._create_summary(list(self.student_page_map))
+        self.zip_data = None
+        self._log_output_done()
+
     def _create_student_page_map(self) :
         students = {}
         for page in self.pdf_page_array :
@@ -406,6 +1163,192 @@ class ExamReader :
         return students
 
 
+def shard_page_ranges(total_pages, workers) :
+    """Splits the page numbers into at most `workers` contiguous (start, stop) ranges, none for an empty scan."""
+    if total_pages <= 0 :
+        return []
+    workers = max(1, min(int(workers), total_pages))
+    size = -(-total_pages // workers)
+    return [(start, min(start + size, total_pages)) for start in range(0, total_pages, size)]
+
+def merge_page_data(shards) :
+    """Concatenates the detect_pages() results of all shards in page order."""
+    page_data = [page for shard in shards for page in shard]
+    page_data.sort(key=lambda page: page["page_num"])
+    return page_data
+
+def _detect_shard(pdf_files_data, scan_options, start, stop, detection_cache=None) :
+    # Returns (page data, log messages), the parent process does the logging
+    messages = []
+    reader = ExamReader(pdf_files_data, scan_options, log_callback=lambda msg, type="info": messages.append((msg, type)))
+    if detection_cache :
+        reader.load_detection_artifact(detection_cache)
+    try :
+        return (asyncio.run(reader.detect_pages(start, stop)), messages)
+    finally :
+        reader.close()
+
+
+class ScanCancelled (Exception) :
+    pass
+
+
+class CancellationToken :
+    """Cooperative cancellation flag, checked between pages and between rotation attempts.
+
+    shared_flag: optional Int32Array view on a SharedArrayBuffer (or any indexable),
+    a non-zero first element cancels. The UI thread can set it while Python is busy,
+    without waiting for the worker to handle a message.
+    """
+    def __init__ (self, shared_flag=None):
+        self.shared_flag = shared_flag
+        self._cancelled = False
+
+    def cancel (self) :
+        self._cancelled = True
+
+    @property
+    def cancelled (self) -> bool:
+        return self._cancelled or (self.shared_flag is not None and self.shared_flag[0] != 0)
+
+    def raise_if_cancelled (self) :
+        if self.cancelled :
+            raise ScanCancelled()
+
+
+class StageProfiler :
+    """Records wall time and peak memory of each processing stage.
+
+    Memory is traced with tracemalloc: Python objects and NumPy/OpenCV buffers,
+    not MuPDF's own heap. peak_bytes is the highest traced total during the
+    stage. A disabled profiler costs one call per stage.
+    """
+    def __init__ (self, enabled=False, sink=None):
+        self.enabled = enabled
+        self.sink = sink  # Called with every finished event, e.g. to stream it to the UI
+        self.events = []
+        self._peaks = []  # Running peak of each open stage, innermost last
+        self._owns_tracing = False
+        if enabled and not tracemalloc.is_tracing() :
+            tracemalloc.start()
+            self._owns_tracing = True
+
+    def stage (self, name, **info) :
+        if not self.enabled :
+            return contextlib.nullcontext()
+        return self._record(name, info)
+
+    @contextlib.contextmanager
+    def _record (self, name, info) :
+        # reset_peak() is global, so save the enclosing stage's peak before an inner stage resets it
+        if self._peaks :
+            self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self._peaks.append(0)
+        start = time.perf_counter()
+        try :
+            yield
+        finally :
+            seconds = time.perf_counter() - start
+            peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+            if self._peaks :
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            event = {"stage": name, "seconds": round(seconds, 6), "peak_bytes": peak, **info}
+            self.events.append(event)
+            if self.sink :
+                self.sink(event)
+
+    def report (self) :
+        stages = {}
+        for event in self.events :
+            total = stages.setdefault(event["stage"], {"count": 0, "seconds": 0.0, "peak_bytes": 0})
+            total["count"] += 1
+            total["seconds"] += event["seconds"]
+            total["peak_bytes"] = max(total["peak_bytes"], event["peak_bytes"])
+        for total in stages.values() :
+            total["seconds"] = round(total["seconds"], 6)
+        return {"stages": stages, "events": list(self.events)}
+
+    def close (self) :
+        if self._owns_tracing :
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+
+class ParityScheduler :
+    """Predicts which pages of a two-page scan carry the QR code.
+
+    Sheets are scanned as front/back pairs with the QR code on one side, so QR
+    and QR-free pages alternate. The prediction follows the detected pages and
+    therefore re-synchronises by itself when a page is missing.
+    """
+    def __init__ (self):
+        self.previous_had_qr = None
+
+    def expects_qr (self, page_num, qr_on_back) :
+        if self.previous_had_qr is None :
+            # Start of the scan (or of a shard): only the very first page's parity is known
+            return not (qr_on_back and page_num == 0)
+        return not self.previous_had_qr
+
+    def record (self, had_qr) :
+        self.previous_had_qr = had_qr
+
+
+class PdfPageIndex :
+    """Virtual concatenation of several PDFs.
+
+    Maps global page numbers to (document, local page number), so the scanned
+    files never have to be merged into one copy.
+    """
+    def __init__ (self):
+        self.documents = []
+        self.page_map = []
+
+    def append (self, document) :
+        doc_index = len(self.documents)
+        self.documents.append(document)
+        self.page_map.extend((doc_index, local_page) for local_page in range(len(document)))
+
+    def extend (self, other) :
+        for document in other.documents :
+            self.append(document)
+        other.documents = []
+        other.page_map = []
+
+    @property
+    def document_count (self) :
+        return len(self.documents)
+
+    @property
+    def page_count (self) :
+        return len(self.page_map)
+
+    def __len__ (self) :
+        return len(self.page_map)
+
+    def locate (self, page_num) :
+        (doc_index, local_page) = self.page_map[page_num]
+        return (self.documents[doc_index], local_page)
+
+    def load_page (self, page_num) :
+        (document, local_page) = self.locate(page_num)
+        return document.load_page(local_page)
+
+    def __getitem__ (self, page_num) :
+        return self.load_page(page_num)
+
+    def insert_page (self, target_pdf, page_num) :
+        (document, local_page) = self.locate(page_num)
+        target_pdf.insert_pdf(document, from_page=local_page, to_page=local_page)
+
+    def close (self) :
+        for document in self.documents :
+            document.close()
+        self.documents = []
+        self.page_map = []
+
+
 class PdfManager : 
     def __init__ (self):
         pass
@@ -433,17 +1376,22 @@ class PdfManager :
             (page1["side"] == "left" and page2["side"] == "right") or (page2["side"] == "none"))
        
     def split_a3(self, fitz_pdf, page_num) :
-        fitz_page = fitz_pdf[page_num]
-        rect = fitz_page.rect
-        left_rect = fitz.Rect(rect.x0, rect.y0, rect.x1 / 2, rect.y1)
-        right_rect = fitz.Rect(rect.x1 / 2, rect.y0, rect.x1, rect.y1)
-
         left_page = fitz.open()
-        left_page1 = left_page.new_page(width=left_rect.width, height=left_rect.height)
-        left_page1.show_pdf_page(left_page1.rect, fitz_pdf, page_num, clip=left_rect)
-
+        self.append_a3_half(left_page, fitz_pdf, page_num, "left")
         right_page = fitz.open()
-        right_page2 = right_page.new_page(width=right_rect.width, height=right_rect.height)
-        right_page2.show_pdf_page(right_page2.rect, fitz_pdf, page_num, clip=right_rect)
+        self.append_a3_half(right_page, fitz_pdf, page_num, "right")
+        return (left_page, right_page)
 
-        return (left_page, right_page)
\ No newline at end of file
+    def append_a3_half(self, target_pdf, fitz_pdf, page_num, side) :
+        """Appends the left or right half of an A3 page to target_pdf.
+
+        Halves shown in the same target share the scan image of the sheet, it is
+        stored once instead of once per half.
+        """
+        rect = fitz_pdf[page_num].rect
+        if side == "left" :
+            clip = fitz.Rect(rect.x0, rect.y0, rect.x1 / 2, rect.y1)
+        else :
+            clip = fitz.Rect(rect.x1 / 2, rect.y0, rect.x1, rect.y1)
+        half_page = target_pdf.new_page(width=clip.width, height=clip.height)
+        half_page.show_pdf_page(half_page.rect, fitz_pdf, page_num, clip=clip)
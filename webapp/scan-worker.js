@@ -22,95 +22,111 @@ async function loadScriptWithSRI(url, expectedHash) {
 }
 
 let pyodide = null;
+let micropip = null;
 let ExamReader = null;
-let isInitialized = false;
+let helperWorkers = [];
+let detectionArtifact = null; // QR detections of earlier scans, keyed by page content hash and detection settings
+let scanSession = null; // Reader of the last scan, kept so further files can be appended
+let scanCancelToken = null; // Cancellation token of the running scan or page range
 
-async function initialize() {
-    if (isInitialized) return;
+// Package sets per feature, dependencies first (Pillow is a reportlab dependency). QR labels
+// only need qrcode and reportlab, so they are usable long before OpenCV and PyMuPDF are loaded.
+const FEATURES = {
+    qr: { packages: ['Pillow', 'reportlab', 'qrcode'], modules: ['qr_generator.py'] },
+    scan: { packages: ['numpy', 'opencv-python', 'PyMuPDF', 'Pillow', 'reportlab'], modules: ['qr_reader.py'] }
+};
+const IMPORT_NAMES = {
+    'qrcode': 'qrcode',
+    'reportlab': 'reportlab.pdfgen.canvas',
+    'Pillow': 'PIL.Image',
+    'numpy': 'numpy',
+    'opencv-python': 'cv2',
+    'PyMuPDF': 'fitz'
+};
+const ALL_PACKAGES = [...new Set(Object.values(FEATURES).flatMap(feature => feature.packages))];
+const ALL_MODULES = Object.values(FEATURES).flatMap(feature => feature.modules);
+const TOTAL_STEPS = 1 + ALL_PACKAGES.length + ALL_MODULES.length;
 
-    try {
-        const params = new URLSearchParams(self.location.search);
-        const version = params.get('v');
-        
-        postMessage({ type: 'LOG', message: 'Loading Pyodide in worker...', level: 'info' });
+let runtimePromise = null;
+const packagePromises = {};
+let installQueue = Promise.resolve(); // micropip installs run one at a time, in request order
+const featurePromises = {};
+let loadedSteps = 0;
 
-        await loadScriptWithSRI(PYODIDE_BASE_URL + 'pyodide.js', PYODIDE_JS_SRI);
-        
-        pyodide = await loadPyodide({
-            indexURL: PYODIDE_BASE_URL
-        });
-        
-        postMessage({ type: 'INIT_PROGRESS', package: 'Pyodide', current: 1, total: 'n'});
-        
-        await pyodide.loadPackage(['micropip']);
-        const micropip = pyodide.pyimport('micropip');
-        
-        const packages = [
-            'Pillow',
-            'reportlab', 
-            'PyPDF2',
-            'PyMuPDF',
-            'opencv-python',
-            'qrcode',
-            'numpy'
-        ];        
-         
-        const modules = [
-            { name: 'qr_reader.py', path: './python_modules/qr_reader.py?v=' + version},
-            { name: 'qr_generator.py', path: './python_modules/qr_generator.py?v=' + version }
-        ];
-        
-        const totalSteps = 1 + packages.length + modules.length;
-
-        let iStep = 0;
-        for (iStep = 0; iStep < packages.length; iStep++) {
-            const pkg = packages[iStep];
-            postMessage({ 
-                type: 'INIT_PROGRESS', 
-                package: pkg, 
-                current: iStep + 2, 
-                total: totalSteps
-            });
-            await micropip.install(pkg);
-        }
-        
-        postMessage({ type: 'LOG', message: 'Loading Python modules...', level: 'info' });
-        
-        for (const module of modules) {
-            try {
-                const response = await fetch(module.path);
-                if (!response.ok) throw new Error(`Failed to load ${module.name}`);
-                const code = await response.text();
-                pyodide.runPython(code);
-                iStep++;
-                postMessage({ 
-                    type: 'INIT_PROGRESS', 
-                    package: module.name, 
-                    current: iStep + 1, 
-                    total: totalSteps
-                });
-            } catch (error) {
-                postMessage({ 
-                    type: 'ERROR', 
-                    message: `Failed to load ${module.name}: ${error.message}` 
-                });
-                throw error;
-            }
-        }
-        
+// Loads the Pyodide runtime only, packages follow per feature
+function initialize() {
+    if (!runtimePromise) {
+        runtimePromise = loadRuntime();
+    }
+    return runtimePromise;
+}
+
+async function loadRuntime() {
+    postMessage({ type: 'LOG', message: 'Loading Pyodide in worker...', level: 'info' });
+
+    await loadScriptWithSRI(PYODIDE_BASE_URL + 'pyodide.js', PYODIDE_JS_SRI);
+    
+    pyodide = await loadPyodide({
+        indexURL: PYODIDE_BASE_URL
+    });
+    
+    await pyodide.loadPackage(['micropip']);
+    micropip = pyodide.pyimport('micropip');
+    postMessage({ type: 'INIT_PROGRESS', package: 'Pyodide', current: ++loadedSteps, total: TOTAL_STEPS });
+}
+
+// Installs and imports everything a feature needs, on first use. Packages are
+// shared between features and installed one after another: concurrent micropip
+// installs of packages that depend on each other are not known to be safe.
+function ensureFeature(name) {
+    if (!featurePromises[name]) {
+        featurePromises[name] = loadFeature(name);
+    }
+    return featurePromises[name];
+}
+
+async function loadFeature(name) {
+    await initialize();
+    
+    const start = performance.now();
+    const feature = FEATURES[name];
+    const timings = await Promise.all(feature.packages.map(installPackage));
+    for (const module of feature.modules) {
+        await loadModule(module);
+    }
+    if (name === 'scan') {
         ExamReader = pyodide.globals.get('ExamReader');
-        
-        isInitialized = true;
-        postMessage({ type: 'INITIALIZED' });
-        postMessage({ type: 'LOG', message: 'Worker initialized successfully', level: 'success' });
-        
-    } catch (error) {
-        postMessage({ 
-            type: 'ERROR', 
-            message: `Initialization failed: ${error.message}` 
+    }
+    
+    postMessage({ type: 'FEATURE_READY', feature: name, timings: timings });
+    postMessage({ type: 'LOG', message: `Feature ${name} ready after ${formatTime(performance.now() - start)}`, level: 'success' });
+}
+
+function installPackage(pkg) {
+    if (!packagePromises[pkg]) {
+        packagePromises[pkg] = installQueue.then(async () => {
+            const start = performance.now();
+            await micropip.install(pkg);
+            const installed = performance.now();
+            await pyodide.runPythonAsync(`import ${IMPORT_NAMES[pkg]}`);
+            const imported = performance.now();
+            
+            postMessage({ type: 'INIT_PROGRESS', package: pkg, current: ++loadedSteps, total: TOTAL_STEPS });
+            postMessage({ type: 'LOG', message: `${pkg}: installed in ${formatTime(installed - start)}, imported in ${formatTime(imported - installed)}`, level: 'info' });
+            return { package: pkg, installMs: Math.round(installed - start), importMs: Math.round(imported - installed) };
         });
-        throw error;
+        // A failed install must not block the ones queued after it
+        installQueue = packagePromises[pkg].catch(() => {});
     }
+    return packagePromises[pkg];
+}
+
+async function loadModule(name) {
+    const version = new URLSearchParams(self.location.search).get('v');
+    const response = await fetch(`./python_modules/${name}?v=${version}`);
+    if (!response.ok) throw new Error(`Failed to load ${name}`);
+    pyodide.runPython(await response.text());
+    postMessage({ type: 'INIT_PROGRESS', package: name, current: ++loadedSteps, total: TOTAL_STEPS });
 }
 
 // Handle messages from main thread
@@ -119,7 +135,14 @@ self.onmessage = async function(event) {
     
     switch (type) {
         case 'INIT':
-            await initialize();
+            // Prefetch both features in parallel, QR generation is usable as soon as its set is loaded
+            try {
+                await Promise.all([ensureFeature('qr'), ensureFeature('scan')]);
+                postMessage({ type: 'INITIALIZED' });
+                postMessage({ type: 'LOG', message: 'Worker initialized successfully', level: 'success' });
+            } catch (error) {
+                postMessage({ type: 'ERROR', message: `Initialization failed: ${error.message}` });
+            }
             break;
             
         case 'GENERATE_QR':
@@ -129,10 +152,26 @@ self.onmessage = async function(event) {
         case 'SCAN_START':
             await handleScan(data);
             break;
+
+        case 'SCAN_DETECT':
+            await handleScanDetect(data);
+            break;
+            
+        case 'SCAN_APPEND':
+            await handleScanAppend(data);
+            break;
+            
+        case 'SCAN_RESET':
+            closeScanSession();
+            detectionArtifact = null;
+            break;
             
         case 'SCAN_CANCEL':
-            // TODO: Implement cancellation
-            postMessage({ type: 'LOG', message: 'Scan cancelled', level: 'warning' });
+            // Runs while Python awaits between pages and rotation attempts, the reader stops at its next check
+            if (scanCancelToken) {
+                scanCancelToken.cancel();
+            }
+            helperWorkers.forEach(helper => helper.postMessage({ type: 'SCAN_CANCEL' }));
             break;
             
         default:
@@ -142,9 +181,7 @@ self.onmessage = async function(event) {
 
 async function handleQRGeneration(data) {
     try {
-        if (!isInitialized) {
-            await initialize();
-        }
+        await ensureFeature('qr');
         
         const {copies, offsetRow, offsetCol, selectedStudents } = data;
         
@@ -155,10 +192,7 @@ async function handleQRGeneration(data) {
         
         postMessage({ type: 'LOG', message: `Generating ${copies} copy/copies with offset (${offsetRow}, ${offsetCol})...`, level: 'info' });
         
-        const pdfBytesProxy = qrGenerator.generate_qr_pdf_bytes(copies, offsetRow, offsetCol);
-        
-        const pdfBytes = new Uint8Array(pdfBytesProxy.toJs());
-        pdfBytesProxy.destroy();
+        const pdfBytes = takeBytes(qrGenerator.generate_qr_pdf_bytes(copies, offsetRow, offsetCol));
         
         postMessage({
             type: 'QR_COMPLETE',
@@ -178,6 +212,244 @@ async function handleQRGeneration(data) {
     }
 }
 
+// Defines the Python callbacks that forward progress and log messages to the main thread
+function defineScanCallbacks() {
+    pyodide.runPython(`
+import js
+from pyodide.ffi import to_js
+
+def progress_callback(percentage):
+    js.postMessage(to_js({
+        'type': 'SCAN_PROGRESS',
+        'percentage': float(percentage)
+    }, dict_converter=js.Object.fromEntries))
+
+def log_callback(message, level='info'):
+    js.postMessage(to_js({
+        'type': 'SCAN_LOG',
+        'message': str(message),
+        'level': str(level)
+    }, dict_converter=js.Object.fromEntries))
+
+def student_callback(file_path, pdf_data, summary_row):
+    # One copy into a JS buffer, which is then transferred to the main thread
+    pdf = js.Uint8Array.new(len(pdf_data))
+    pdf.assign(pdf_data)
+    js.postMessage(to_js({
+        'type': 'SCAN_STUDENT',
+        'path': file_path,
+        'pdf': pdf,
+        'row': summary_row
+    }, dict_converter=js.Object.fromEntries), to_js([pdf.buffer]))
+    `);
+}
+
+// Sharded first pass: this worker scans the first page range, helper workers
+// (each with its own Pyodide runtime and reader) scan the others. Returns null
+// if any shard was cancelled, the page data are incomplete then.
+async function detectSharded(examReader, pdfFiles, readerOptions, scanWorkers, cancelFlag) {
+    const shardsProxy = pyodide.globals.get('shard_page_ranges')(examReader.source_pdf.page_count, scanWorkers);
+    const shards = shardsProxy.toJs();
+    shardsProxy.destroy();
+    
+    postMessage({ type: 'SCAN_LOG', message: `Scanning ${shards.length} page range(s) in parallel...`, level: 'info' });
+    
+    const ownShard = (async () => {
+        try {
+            const pageDataProxy = await examReader.detect_pages(shards[0][0], shards[0][1]);
+            const pageData = pageDataProxy.toJs({ dict_converter: Object.fromEntries });
+            pageDataProxy.destroy();
+            return pageData;
+        } catch (error) {
+            if (examReader.cancelled) return null;
+            throw error;
+        }
+    })();
+    const helperShards = shards.slice(1).map(([start, stop], index) =>
+        detectInHelper(getHelperWorker(index), pdfFiles, readerOptions, start, stop, cancelFlag)
+    );
+    
+    const results = await Promise.all([ownShard, ...helperShards]);
+    if (results.includes(null)) return null;
+    return results.flat().sort((a, b) => a.page_num - b.page_num);
+}
+
+function getHelperWorker(index) {
+    if (!helperWorkers[index]) {
+        helperWorkers[index] = new Worker(self.location.href);
+    }
+    return helperWorkers[index];
+}
+
+function detectInHelper(helper, pdfFiles, readerOptions, start, stop, cancelFlag) {
+    return new Promise((resolve, reject) => {
+        helper.onmessage = (event) => {
+            const message = event.data;
+            switch (message.type) {
+                case 'SCAN_DETECT_COMPLETE':
+                    resolve(message.pageData);
+                    break;
+                case 'SCAN_CANCELLED':
+                    resolve(null);
+                    break;
+                case 'ERROR':
+                    reject(new Error(message.message));
+                    break;
+                case 'SCAN_LOG':
+                    postMessage(message);
+                    break;
+            }
+        };
+        helper.postMessage({
+            type: 'SCAN_DETECT',
+            data: { pdfFiles, options: readerOptions, start, stop, cancelFlag }
+        });
+    });
+}
+
+async function handleScanDetect(data) {
+    try {
+        await ensureFeature('scan');
+        
+        const { pdfFiles, options, start, stop, cancelFlag } = data;
+        
+        defineScanCallbacks();
+        const logCallback = pyodide.globals.get('log_callback');
+        
+        const examReader = ExamReader(pdfFiles, options);
+        examReader.log_callback = logCallback;
+        setCancelToken(examReader, cancelFlag);
+        
+        try {
+            const pageDataProxy = await examReader.detect_pages(start, stop);
+            const pageData = pageDataProxy.toJs({ dict_converter: Object.fromEntries });
+            pageDataProxy.destroy();
+            postMessage({ type: 'SCAN_DETECT_COMPLETE', pageData: pageData });
+        } catch (error) {
+            if (!examReader.cancelled) throw error;
+            postMessage({ type: 'SCAN_CANCELLED' });
+        } finally {
+            clearCancelToken();
+            examReader.close();
+            examReader.destroy();
+            logCallback.destroy();
+        }
+        
+    } catch (error) {
+        postMessage({ 
+            type: 'ERROR', 
+            message: `Scan error in pages ${data.start + 1}-${data.stop}: ${error.message}` 
+        });
+    }
+}
+
+// Copies a Python bytes object straight out of WASM memory into a transferable
+// Uint8Array: one copy, where toJs() plus new Uint8Array() made two
+function takeBytes(bytesProxy) {
+    const buffer = bytesProxy.getBuffer('u8');
+    try {
+        return buffer.data.slice();
+    } finally {
+        buffer.release();
+        bytesProxy.destroy();
+    }
+}
+
+// cancelFlag: Int32Array on a SharedArrayBuffer (cross-origin isolated pages only), lets the
+// UI cancel without a message round trip. Without it, SCAN_CANCEL is handled while the reader
+// awaits between rotation attempts
+function setCancelToken(examReader, cancelFlag) {
+    clearCancelToken();
+    const CancellationToken = pyodide.globals.get('CancellationToken');
+    scanCancelToken = CancellationToken(cancelFlag || null);
+    CancellationToken.destroy();
+    examReader.cancel_token = scanCancelToken;
+}
+
+function clearCancelToken() {
+    if (!scanCancelToken) return;
+    scanCancelToken.destroy();
+    scanCancelToken = null;
+}
+
+function postScanFailure(examReader) {
+    if (examReader.cancelled) {
+        postMessage({ type: 'SCAN_CANCELLED' });
+    } else {
+        postMessage({ type: 'ERROR', message: 'PDF scan failed!' });
+    }
+}
+
+function postScanResults(examReader, start) {
+    postMessage({ type: 'SCAN_LOG', message: 'Scan completed, preparing results...', level: 'success' });
+    
+    const reportProxy = examReader.get_profile_report();
+    const report = reportProxy.toJs({ dict_converter: Object.fromEntries });
+    reportProxy.destroy();
+    if (report.events.length) {
+        postMessage({ type: 'SCAN_PROFILE', report: report });
+    }
+    
+    // Progressive output: student PDFs were already posted, the main thread builds the archive
+    const zipBytes = examReader.progressive_output ? null : takeBytes(examReader.get_zip_bytes());
+    const summaryBytes = takeBytes(examReader.get_summary_bytes());
+    
+    postMessage({
+        type: 'SCAN_COMPLETE',
+        zipBytes: zipBytes,
+        summaryBytes: summaryBytes
+    }, zipBytes ? [zipBytes.buffer, summaryBytes.buffer] : [summaryBytes.buffer]);
+    
+    const end = performance.now();
+    postMessage({ type: 'SCAN_LOG', message: `Results downloaded. Completed in ${formatTime(end-start)}`, level: 'success' });
+}
+
+function closeScanSession() {
+    if (!scanSession) return;
+    
+    scanSession.examReader.close();
+    scanSession.examReader.destroy();
+    scanSession.progressCallback.destroy();
+    scanSession.logCallback.destroy();
+    scanSession.studentCallback.destroy();
+    scanSession = null;
+    clearCancelToken();
+}
+
+async function handleScanAppend(data) {
+    try {
+        if (!scanSession) {
+            postMessage({ type: 'ERROR', message: 'No scan session to append files to.' });
+            return;
+        }
+        
+        const { pdfFiles, cancelFlag } = data;
+        setCancelToken(scanSession.examReader, cancelFlag);
+        postMessage({ type: 'SCAN_LOG', message: `Appending ${pdfFiles.length} file(s) to the scan...`, level: 'info' });
+        
+        const start = performance.now();
+        const pdfFilesForPython = pdfFiles.map(file => ({
+            name: file.name,
+            data: file.data
+        }));
+        const success = await scanSession.examReader.append_files(pdfFilesForPython);
+        
+        if (success) {
+            detectionArtifact = scanSession.examReader.get_detection_artifact();
+            postScanResults(scanSession.examReader, start);
+        } else {
+            postScanFailure(scanSession.examReader);
+            closeScanSession();
+        }
+        
+    } catch (error) {
+        postMessage({ 
+            type: 'ERROR', 
+            message: `Scan error: ${error.message}\n${error.stack}` 
+        });
+    }
+}
+
 function formatTime(ms) {
     if (ms < 1000) 
         return `${ms.toFixed(0)}ms`;
@@ -190,84 +462,78 @@ function formatTime(ms) {
 
 async function handleScan(data) {
     try {
-        if (!isInitialized) {
-            await initialize();
-        }
+        await ensureFeature('scan');
         
-        const { pdfFiles, options } = data;
+        const { pdfFiles, options, cancelFlag } = data;
         
         postMessage({ type: 'SCAN_LOG', message: 'Starting PDF scan...', level: 'info' });
         
-        // Create progress callback that sends messages back to main thread
-        pyodide.runPython(`
-import js
-from pyodide.ffi import to_js
-
-def progress_callback(percentage):
-    js.postMessage(to_js({
-        'type': 'SCAN_PROGRESS',
-        'percentage': float(percentage)
-    }, dict_converter=js.Object.fromEntries))
-
-def log_callback(message, level='info'):
-    js.postMessage(to_js({
-        'type': 'SCAN_LOG',
-        'message': str(message),
-        'level': str(level)
-    }, dict_converter=js.Object.fromEntries))
-        `);
+        closeScanSession();
+        defineScanCallbacks();
         
         const progressCallback = pyodide.globals.get('progress_callback');
         const logCallback = pyodide.globals.get('log_callback');
+        const studentCallback = pyodide.globals.get('student_callback');
         
         const pdfFilesForPython = pdfFiles.map(file => ({
             name: file.name,
             data: file.data
         }));
         
-        const examReader = ExamReader(pdfFilesForPython, {
+        const readerOptions = {
             two_page_scan: options.twoPageScan || false,
             split_a3: options.splitA3 || false,
             quick_and_dirty: options.quickAndDirty || false,
             qr_position_a4: options.qrPositionA4 || 'vorne',
-            qr_position_a3: options.qrPositionA3 || 'aussen'
-        });
+            qr_position_a3: options.qrPositionA3 || 'aussen',
+            render_zoom: options.renderZoom || 3,
+            stream_output: options.streamOutput || false,
+            page_time_budget: options.pageTimeBudget || 0,
+            profile: options.profile || false,
+            progressive_output: options.progressiveOutput || false,
+            optimize_output: options.optimizeOutput || false,
+            output_dpi: options.outputDpi || 150,
+            output_jpeg_quality: options.outputJpegQuality || 60,
+            output_color: options.outputColor || 'color'
+        };
+        const examReader = ExamReader(pdfFilesForPython, readerOptions);
         
         examReader.progress_callback = progressCallback;
         examReader.log_callback = logCallback;
+        examReader.student_callback = studentCallback;
+        setCancelToken(examReader, cancelFlag);
+        if (detectionArtifact) {
+            examReader.load_detection_artifact(detectionArtifact);
+        }
         
         const start = performance.now();
-        const success = await examReader.process();
+        
+        let pageData = null;
+        const scanWorkers = Math.max(1, options.scanWorkers || 1);
+        if (scanWorkers > 1 && examReader.uncached_page_count() > 0) {
+            pageData = await detectSharded(examReader, pdfFilesForPython, readerOptions, scanWorkers, cancelFlag);
+            if (pageData === null) {
+                // Some shard was cancelled: process() then stops right away and returns false
+                examReader.cancel();
+            }
+        }
+        
+        const success = await examReader.process(pageData);
         
         if (success) {
-            postMessage({ type: 'SCAN_LOG', message: 'Scan completed, preparing results...', level: 'success' });
-            
-            const zipBytesProxy = examReader.get_zip_bytes();
-            const summaryBytesProxy = examReader.get_summary_bytes();
-            
-            const zipBytes = new Uint8Array(zipBytesProxy.toJs());
-            const summaryBytes = new Uint8Array(summaryBytesProxy.toJs());
-            
-            zipBytesProxy.destroy();
-            summaryBytesProxy.destroy();
-            
-            postMessage({
-                type: 'SCAN_COMPLETE',
-                zipBytes: zipBytes,
-                summaryBytes: summaryBytes
-            }, [zipBytes.buffer, summaryBytes.buffer]);
-            
-            const end = performance.now();
-            postMessage({ type: 'SCAN_LOG', message: `Results downloaded. Completed in ${this.formatTime(end-start)}`, level: 'success' });
-            
+            detectionArtifact = examReader.get_detection_artifact();
+            postScanResults(examReader, start);
+            scanSession = { examReader, progressCallback, logCallback, studentCallback };
         } else {
-            postMessage({ type: 'ERROR', message: 'PDF scan failed!' });
+            postScanFailure(examReader);
+            clearCancelToken();
+            examReader.close();
+            examReader.destroy();
+            progressCallback.destroy();
+            logCallback.destroy();
+            studentCallback.destroy();
         }
         
-        examReader.close();
-        progressCallback.destroy();
-        logCallback.destroy();
-        
     } catch (error) {
         postMessage({ 
             type: 'ERROR', 